@@ -6,33 +6,70 @@
 """
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext, font
+from tkinter import ttk, filedialog, messagebox, scrolledtext, simpledialog, font
+import copy
 import json
 import os
+import re
 import sys
 from pathlib import Path
 import logging
+from logging.handlers import QueueHandler, QueueListener
 import threading
 import queue
-import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 from weibo import Weibo, setup_logging, get_config
 from session_manager import SessionManager, ScheduleManager
 from statistics_manager import StatisticsManager
+from util.fileutil import atomic_write_bytes
 
-# 圖表支持
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+
+# 兩種實作的輸出逐位元組相同：縮排2格、非ASCII字元直接以UTF-8寫出
 try:
-    import matplotlib
-    matplotlib.use('TkAgg')
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    from matplotlib.figure import Figure
-    import matplotlib.dates as mdates
-    MATPLOTLIB_AVAILABLE = True
+    import orjson
+
+    def _dump_config(config):
+        return orjson.dumps(config, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
 except ImportError:
-    MATPLOTLIB_AVAILABLE = False
-    logging.warning("matplotlib未安裝，圖表功能將被禁用")
+    def _dump_config(config):
+        return json.dumps(config, ensure_ascii=False, indent=2).encode('utf-8')
+
+# 圖表支持（首次開啟統計頁面時才載入matplotlib）
+MATPLOTLIB_AVAILABLE = None  # None 表示尚未嘗試載入
+Figure = FigureCanvasTkAgg = Patch = np = None
+
+
+def ensure_matplotlib():
+    """載入matplotlib並回傳是否可用，只在第一次呼叫時實際匯入"""
+    global MATPLOTLIB_AVAILABLE, Figure, FigureCanvasTkAgg, Patch, np
+    if MATPLOTLIB_AVAILABLE is None:
+        try:
+            # 直接使用 Figure + FigureCanvasTkAgg，不經過pyplot，也就不需要選擇pyplot後端
+            import matplotlib
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            from matplotlib.figure import Figure
+            from matplotlib.patches import Patch
+            import numpy as np
+
+            # 全局設定只做一次：中文字體候選、簡化路徑以加快繪製
+            matplotlib.rcParams.update({
+                'font.family': 'sans-serif',
+                'font.sans-serif': ['Microsoft JhengHei', 'Microsoft YaHei', 'PingFang TC',
+                                    'Noto Sans CJK TC', 'WenQuanYi Micro Hei', 'DejaVu Sans'],
+                'axes.unicode_minus': False,  # 中文字體多半缺少負號字形
+                'path.simplify': True,
+                'path.simplify_threshold': 1.0,
+                'agg.path.chunksize': 10000,
+            })
+            MATPLOTLIB_AVAILABLE = True
+        except ImportError:
+            MATPLOTLIB_AVAILABLE = False
+            logging.warning("matplotlib未安裝，圖表功能將被禁用")
+    return MATPLOTLIB_AVAILABLE
 
 class WeiboCrawlerGUI:
     def __init__(self, root):
@@ -55,16 +92,52 @@ class WeiboCrawlerGUI:
             "download_repost": tk.BooleanVar(value=False),
         }
 
+        # 任一配置變數被寫入過即標記，儲存和建立配置時不必逐一讀取
+        self._any_set = False
+        self._applying_config = False
+        self._ui_snapshot = None  # build_config_from_ui 的變數快照
+        self._ui_snapshot_dirty = True
+        for var in self.config_vars.values():
+            var.trace_add('write', self._mark_config_set)
+
         # 自動模式設定
         self.auto_start_var = tk.BooleanVar(value=False)
         self.countdown_var = tk.StringVar(value="")
+        self._countdown_id = None
 
         # 日誌隊列和狀態
-        self.log_queue = queue.Queue()
+        self.log_queue = queue.Queue(-1)
+        self._log_lines = deque()  # 已格式化、等待寫入UI的日誌
+        self._log_flush_scheduled = threading.Event()
+        self.event_queue = queue.Queue()  # 爬蟲線程 -> UI 的事件隊列
+        self.stop_event = threading.Event()
+        self._pending = {}  # 等待寫入Tk變數的進度/狀態
+        self._flush_scheduled = False
         self.progress_var = tk.DoubleVar()
         self.status_var = tk.StringVar(value="就緒")
         self.stats_var = tk.StringVar(value="等待開始...")
         self.is_running = False
+        self.max_log_lines = 5000  # 日誌區域最多保留的行數
+        self.log_flush_interval = 50  # 日誌寫入UI的最短間隔(毫秒)
+        self._log_backlog = deque(maxlen=self.max_log_lines)  # 日誌頁面建立前的暫存
+        self._log_ring = deque(maxlen=100_000)  # 儲存日誌用的副本
+        self.max_crawl_workers = 8  # 同時爬取的用戶數上限
+        self.event_poll_interval = 500  # 事件隊列備援輪詢間隔(毫秒)
+        self.stats_refresh_delay = 250  # 合併統計刷新請求的間隔(毫秒)
+        self._stats_refresh_id = None
+        self._stats_refresh_force = False
+        self._last_stats_key = None  # 上次顯示的總結統計，沒有變化時不重繪
+
+        # 已解析的config.json緩存 (mtime, config)
+        self._config_cache = None
+        self._cfg_executor = ThreadPoolExecutor(max_workers=1)  # 讀取配置、儲存日誌用的背景線程
+        self._user_list_cache = None  # (path, mtime, 首行, 用戶列表)
+        self._last_user_dir = None  # 上次選擇用戶列表文件的目錄
+        self._user_dialog = None  # 重用的用戶選擇對話框 (Toplevel, Listbox, 選擇結果變數)
+        self._session_cookie = None  # 共用session目前套用的cookie字串
+
+        # 共用的HTTP連線池，避免每次爬取重新握手
+        self.http_session = Weibo.create_session()
 
         # 初始化管理器
         self.session_manager = SessionManager()
@@ -75,12 +148,21 @@ class WeiboCrawlerGUI:
         self.setup_styles()
         self.root.configure(bg='#F8F9FA')
 
-        # 創建界面
-        self.create_widgets()
+        # 創建界面，建立期間隱藏視窗以免每個組件都觸發重新排版
+        self.root.withdraw()
+        try:
+            self.create_widgets()
+        finally:
+            self.root.update_idletasks()
+            self.root.deiconify()
 
         # 設置日誌处理器
         self.setup_logging()
 
+        # 處理爬蟲線程的事件：虛擬事件即時喚醒，after()輪詢作為備援
+        self.root.bind('<<WeiboEvent>>', lambda e: self._process_events())
+        self.root.after(self.event_poll_interval, self._drain_events)
+
         # 載入現有配置
         self.load_config()
 
@@ -89,7 +171,7 @@ class WeiboCrawlerGUI:
 
         # 啟動排程服務
         self.schedule_manager.start_scheduler()
-        self.start_scheduler_thread()
+        self.log_message("排程服務已啟動")
 
     def setup_styles(self):
         """設置字體和樣式"""
@@ -101,23 +183,32 @@ class WeiboCrawlerGUI:
         except:
             pass
 
+        # 建立共用的具名字體，只解析一次
+        self.fonts = {
+            "TitleFont": font.Font(name="TitleFont", family="Microsoft YaHei", size=14, weight="bold"),
+            "StatusFont": font.Font(name="StatusFont", family="Microsoft YaHei", size=10),
+            "BoldFont": font.Font(name="BoldFont", family="Microsoft YaHei", size=10, weight="bold"),
+            "NormalFont": font.Font(name="NormalFont", family="Microsoft YaHei", size=9),
+            "DialogFont": font.Font(name="DialogFont", family="Arial", size=10, weight="bold"),
+        }
+
         # 自定義樣式
         style.configure("Title.TLabel",
-                       font=("Microsoft YaHei", 14, "bold"),
+                       font="TitleFont",
                        foreground="#2E86C1",
                        padding=(10, 10))
 
         style.configure("Status.TLabel",
-                       font=("Microsoft YaHei", 10),
+                       font="StatusFont",
                        foreground="#28A745",
                        background="#F8F9FA")
 
         style.configure("Large.TButton",
-                       font=("Microsoft YaHei", 10, "bold"),
+                       font="BoldFont",
                        padding=(15, 10))
 
         style.configure("Normal.TButton",
-                       font=("Microsoft YaHei", 9),
+                       font="NormalFont",
                        padding=(8, 4))
 
         # 進度條樣式
@@ -158,18 +249,41 @@ class WeiboCrawlerGUI:
         # 配置頁面
         self.create_config_tab()
 
+        # 排程管理頁面和日誌頁面在首次切換時才建立
+        self._tab_built = {'config': True, 'schedule': False, 'log': False}
+        self._tab_frames = {}
+
         # 排程管理頁面
-        self.create_schedule_tab()
+        self._tab_frames['schedule'] = ttk.Frame(self.notebook)
+        self.notebook.add(self._tab_frames['schedule'], text="排程管理")
 
         # 統計儀表板
         self.create_statistics_tab()
 
         # 日誌頁面
-        self.create_log_tab()
+        self._tab_frames['log'] = ttk.Frame(self.notebook)
+        self.notebook.add(self._tab_frames['log'], text="運行日誌")
+
+        self.notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
 
         # 底部按鈕
         self.create_bottom_buttons()
 
+    def _on_tab_changed(self, event):
+        """首次切換到頁面時建立其內容"""
+        selected = self.notebook.select()
+        if selected == str(self._stats_frame):
+            if self.figure is None and MATPLOTLIB_AVAILABLE is None:
+                self._build_chart()
+            return
+        for key, frame in self._tab_frames.items():
+            if str(frame) == selected and not self._tab_built[key]:
+                if key == 'schedule':
+                    self.create_schedule_tab()
+                elif key == 'log':
+                    self.create_log_tab()
+                break
+
     def create_config_tab(self):
         """創建配置設定頁面"""
         config_frame = ttk.Frame(self.notebook)
@@ -231,23 +345,21 @@ class WeiboCrawlerGUI:
         btn_frame = ttk.Frame(config_frame)
         btn_frame.pack(pady=10)
 
-        ttk.Button(btn_frame, text="載入配置", command=self.load_config).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="載入配置", command=lambda: self.load_config(interactive=True)).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="儲存配置", command=self.save_config).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="測試連線", command=self.test_connection).pack(side=tk.LEFT, padx=5)
 
         # 配置欄位
-        main_settings.columnconfigure(1, weight=1)
-        type_frame.columnconfigure(1, weight=1)
-        download_frame.columnconfigure(2, weight=1)
-        output_frame.columnconfigure(3, weight=1)
+        for frame, column in ((main_settings, 1), (type_frame, 1),
+                              (download_frame, 2), (output_frame, 3)):
+            frame.grid_columnconfigure(column, weight=1)
 
     def create_log_tab(self):
         """創建日誌顯示頁面"""
-        log_frame = ttk.Frame(self.notebook)
-        self.notebook.add(log_frame, text="運行日誌")
+        log_frame = self._tab_frames['log']
 
         # 創建滾動文字區域
-        self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, height=25)
+        self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, height=25, state='disabled')
         self.log_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
         # 日誌操作按鈕
@@ -257,6 +369,13 @@ class WeiboCrawlerGUI:
         ttk.Button(log_btn_frame, text="清空日誌", command=self.clear_log).pack(side=tk.LEFT, padx=5)
         ttk.Button(log_btn_frame, text="儲存日誌", command=self.save_log).pack(side=tk.RIGHT, padx=5)
 
+        self._tab_built['log'] = True
+
+        # 寫入建立前暫存的日誌
+        if self._log_backlog:
+            self._append_log_lines(list(self._log_backlog))
+            self._log_backlog.clear()
+
     def create_bottom_buttons(self):
         """創建底部操作按鈕"""
         btn_frame = ttk.Frame(self.root)
@@ -267,66 +386,115 @@ class WeiboCrawlerGUI:
 
     def select_user_file(self):
         """選擇用戶ID列表文件"""
+        options = {}
+        if self._last_user_dir:
+            options["initialdir"] = self._last_user_dir
         filename = filedialog.askopenfilename(
             title="選擇用戶ID列表文件",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+            **options
         )
         if filename:
-            self.config_vars["user_id_list"].set(filename)
+            self._last_user_dir = os.path.dirname(filename)
+            if filename != self.config_vars["user_id_list"].get():
+                self.config_vars["user_id_list"].set(filename)
+
+    def load_config(self, *, interactive=False):
+        """在背景線程讀取配置，完成後於主線程套用到UI
 
-    def load_config(self):
-        """載入現有配置"""
+        interactive為True時(按鈕觸發)才以對話框提示結果，啟動時的自動載入只寫入日誌
+        """
+        future = self._cfg_executor.submit(self._get_config_cached)
+        future.add_done_callback(lambda f: self._post_event(('config', f, interactive)))
+
+    def _apply_config(self, future, interactive=False):
+        """將讀取完成的配置套用到UI變數"""
         try:
-            config = get_config()
-            for key, var in self.config_vars.items():
-                if key == "user_id_list":
-                    if isinstance(config.get(key), list):
-                        var.set("列表模式")
-                    else:
-                        var.set(config.get(key, ""))
-                elif key.startswith("write_"):
-                    formats = config.get("write_mode", [])
-                    format_name = key.replace("write_", "")
-                    var.set(format_name in formats)
-                elif key in config:
-                    var.set(config[key])
-
-            messagebox.showinfo("成功", "配置載入完成")
+            try:
+                config = future.result()
+            except SystemExit:
+                # get_config 在文件缺失或格式錯誤時會呼叫 sys.exit
+                raise ValueError("config.json 不存在或格式不正確")
+
+            # 程式寫入的變數不算使用者修改，不取消自動啟動
+            self._applying_config = True
+            formats = frozenset(config.get("write_mode", []))
+            try:
+                for key, var in self.config_vars.items():
+                    if key == "user_id_list":
+                        if isinstance(config.get(key), list):
+                            var.set("列表模式")
+                        else:
+                            var.set(config.get(key, ""))
+                    elif key.startswith("write_"):
+                        format_name = key.replace("write_", "")
+                        var.set(format_name in formats)
+                    elif key in config:
+                        var.set(config[key])
+            finally:
+                self._applying_config = False
+
+            if interactive:
+                messagebox.showinfo("成功", "配置載入完成")
+            else:
+                self.log_message("配置載入完成")
         except Exception as e:
             self.log_message(f"載入配置失敗: {e}")
+            if interactive:
+                messagebox.showerror("錯誤", f"載入配置失敗: {e}")
+
+    def _mark_config_set(self, *args):
+        """配置變數寫入時的回呼，使用者修改配置時取消自動啟動倒計時"""
+        self._any_set = True
+        self._ui_snapshot_dirty = True
+        if not self._applying_config:
+            self.cancel_countdown()
+
+    def _get_config_cached(self):
+        """獲取配置，config.json未修改時使用緩存"""
+        try:
+            mtime = os.stat(CONFIG_PATH).st_mtime
+        except OSError:
+            mtime = None
+
+        if self._config_cache is None or mtime is None or self._config_cache[0] != mtime:
+            self._config_cache = (mtime, get_config())
+
+        # 回傳副本，避免呼叫方修改緩存內容
+        return copy.deepcopy(self._config_cache[1])
 
     def save_config(self):
         """儲存配置到文件"""
         try:
-            config_path = os.path.join(os.path.dirname(__file__), "config.json")
-            config = get_config()
+            config = self._get_config_cached()
+            ui_config = self.build_config_from_ui()
 
             # 更新配置
-            for key, var in self.config_vars.items():
+            for key, value in ui_config.items():
                 if key == "user_id_list":
-                    value = var.get()
                     if value != "列表模式":
                         config[key] = value
-                elif key.startswith("write_"):
-                    format_name = key.replace("write_", "")
-                    if var.get():
-                        if format_name not in config.get("write_mode", []):
-                            config.setdefault("write_mode", []).append(format_name)
-                    else:
-                        if format_name in config.get("write_mode", []):
-                            config["write_mode"].remove(format_name)
+                elif key == "write_mode":
+                    # 只調整UI上可選的格式，保留檔案中其他寫入模式
+                    write_modes = set(config.get("write_mode", []))
+                    selected = set(value)
+                    for format_name in ("csv", "json", "sqlite"):
+                        if format_name in selected:
+                            write_modes.add(format_name)
+                        else:
+                            write_modes.discard(format_name)
+                    config["write_mode"] = sorted(write_modes)
                 else:
-                    config[key] = var.get()
+                    config[key] = value
 
             # 寫入文件
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=4)
+            atomic_write_bytes(CONFIG_PATH, _dump_config(config))
+            self._config_cache = (os.stat(CONFIG_PATH).st_mtime, copy.deepcopy(config))
 
             # 保存會話（但不啟用自動啟動）
-            if any(self.config_vars[key].get() for key in self.config_vars.keys()):
-                session_config = self.build_config_from_ui()
+            if self._any_set:
                 self.session_manager.save_session(
-                    config=session_config,
+                    config=ui_config,
                     auto_start_enabled=self.auto_start_var.get()
                 )
 
@@ -346,14 +514,14 @@ class WeiboCrawlerGUI:
             return
 
         try:
-            config = get_config()
+            config = self._get_config_cached()
 
             # 使用當前UI配置而不是檔案中的配置
             ui_config = self.build_config_from_ui()
             config.update(ui_config)
 
+            # 使用獨立的實例與session，不影響爬取中共用的連線與狀態
             wb = Weibo(config)
-            wb._Weibo__validate_config(config)  # 測試配置驗證
 
             # 嘗試獲取第一個用戶資訊
             wb.user_config_list = wb.get_user_config_list(user_list_file)
@@ -371,74 +539,238 @@ class WeiboCrawlerGUI:
                 self.log_message("Connection test failed: User list is empty")
                 messagebox.showwarning("Warning", "Connection test failed: User list is empty")
 
+        except SystemExit:
+            # 配置驗證失敗時 Weibo 會呼叫 sys.exit，詳細原因已寫入日誌
+            self.log_message("Connection test failed: invalid config")
+            messagebox.showerror("Error", "Connection test failed: invalid config, see log for details")
         except Exception as e:
             self.log_message(f"Connection test failed: {e}")
             messagebox.showerror("Error", f"Connection test failed: {e}")
 
+    def _sync_session_cookies(self, config):
+        """共用session不由Weibo設定cookie，配置的cookie變更時同步
+
+        只在爬取線程啟動工作線程前呼叫，此時沒有其他線程使用該session
+        """
+        cookie = config.get("cookie", "")
+        if cookie != self._session_cookie:
+            self.http_session.cookies.clear()
+            self.http_session.cookies.update(Weibo.parse_cookie(cookie))
+            self._session_cookie = cookie
+
     def start_crawling(self):
         """開始爬取"""
+        if self.is_running:
+            # 同一時間只執行一次爬取，工作線程共用的session不會被另一次爬取改動
+            self.log_message("爬取正在進行中")
+            return
         if messagebox.askyesno("確認", "確定要開始爬取微博嗎？\n這可能需要較長時間。"):
             self.log_message("開始爬取微博...")
             self.is_running = True
+            self.stop_event.clear()
+            self.progress_var.set(0)
+            self.status_var.set("爬取中")
             # 在新線程中運行
             self.crawler_thread = threading.Thread(target=self._run_crawler)
             self.crawler_thread.daemon = True
             self.crawler_thread.start()
 
     def _run_crawler(self):
-        """在新線程中運行爬蟲"""
+        """在新線程中運行爬蟲，透過event_queue回報進度"""
+        status = "錯誤"
         try:
-            config = get_config()
-            wb = Weibo(config)
-            wb.start()
-            self.log_message("爬取完成！")
+            config = self._get_config_cached()
+            # 每次爬取都建立新實例：重新讀取用戶列表文件，相對的since_date也依當天重新計算
+            self._sync_session_cookies(config)
+            user_config_list = Weibo(config, session=self.http_session).user_config_list
+            total = len(user_config_list)
+            # 讓Weibo的分頁迴圈與等待能響應停止請求
+            config["_stop_event"] = self.stop_event
+
+            done = 0
+            workers = max(1, min(self.max_crawl_workers, total))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(self._crawl_one_user, config, user_config): user_config
+                    for user_config in user_config_list
+                }
+                for future in as_completed(futures):
+                    user_id = futures[future].get("user_id")
+                    try:
+                        future.result()
+                    except SystemExit as e:
+                        # 重試耗盡或放棄驗證碼時 Weibo 會呼叫 sys.exit，只視為該用戶失敗
+                        self._post_event(('log', f"爬取用戶 {user_id} 失敗: {str(e) or '已中止'}"))
+                    except Exception as e:
+                        self._post_event(('log', f"爬取用戶 {user_id} 時發生錯誤: {e}"))
+                    done += 1
+                    self._post_event(('progress', done, total))
+
+            if self.stop_event.is_set():
+                self._post_event(('log', "爬取已停止"))
+                status = "已停止"
+            else:
+                self._post_event(('log', "爬取完成！"))
+                status = "完成"
+        except SystemExit:
+            # 配置驗證失敗時 Weibo 會呼叫 sys.exit，詳細原因已寫入日誌
+            self._post_event(('log', "爬取過程中發生錯誤: 配置無效，詳見日誌"))
         except Exception as e:
-            self.log_message(f"爬取過程中發生錯誤: {e}")
+            self._post_event(('log', f"爬取過程中發生錯誤: {e}"))
         finally:
-            self.is_running = False
+            # 無論如何結束都要送出done，否則is_running會一直為True
+            self._post_event(('done', status))
+
+    def _crawl_one_user(self, config, user_config):
+        """在工作線程中爬取單個用戶，每個用戶使用獨立的Weibo實例"""
+        if self.stop_event.is_set():
+            return
+        # 傳入已解析的用戶配置，不在工作線程中重新讀取用戶列表文件
+        wb = Weibo(config, session=self.http_session, user_config_list=[user_config])
+        wb.crawl_user(user_config)
+
+    def _post_event(self, event):
+        """由爬蟲線程送出事件，並以虛擬事件喚醒主線程"""
+        self.event_queue.put(event)
+        try:
+            self.root.event_generate('<<WeiboEvent>>', when='tail')
+        except (tk.TclError, RuntimeError):
+            # Tcl未以多線程編譯或視窗已關閉，交由_drain_events輪詢處理
+            pass
+
+    def _drain_events(self):
+        """定期處理事件隊列，防止遺漏虛擬事件"""
+        self._process_events()
+        self.root.after(self.event_poll_interval, self._drain_events)
+
+    def _process_events(self):
+        """在主線程中處理爬蟲線程送來的事件"""
+        while True:
+            try:
+                event = self.event_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                kind = event[0]
+                if kind == 'log':
+                    self.log_message(event[1])
+                elif kind == 'progress':
+                    done, total = event[1], event[2]
+                    self._pending['progress'] = done * 100 / max(total, 1)
+                    self._pending['stats'] = f"已完成 {done}/{total} 個用戶"
+                elif kind == 'config':
+                    self._apply_config(event[1], interactive=event[2])
+                elif kind == 'done':
+                    self.is_running = False
+                    self._pending['status'] = event[1]
+            finally:
+                self.event_queue.task_done()
+
+        if self._pending and not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.root.after_idle(self._flush_ui)
+
+    def _flush_ui(self):
+        """於閒置時一次性寫入累積的進度/狀態"""
+        pending, self._pending = self._pending, {}
+        self._flush_scheduled = False
+        if 'progress' in pending:
+            self.progress_var.set(pending['progress'])
+        if 'stats' in pending:
+            self.stats_var.set(pending['stats'])
+        if 'status' in pending:
+            self.status_var.set(pending['status'])
 
     def stop_crawling(self):
         """停止爬取"""
-        self.is_running = False
+        self.stop_event.set()
         self.log_message("正在停止爬取...")
 
     def setup_logging(self):
         """設置日誌處理器"""
-        class GUILogHandler(logging.Handler):
+        class TkEmitHandler(logging.Handler):
+            """在監聽線程中格式化日誌，並排程主線程在短暫延遲後一次性寫入"""
             def __init__(self, gui):
                 super().__init__()
                 self.gui = gui
 
             def emit(self, record):
-                msg = self.format(record)
-                self.gui.log_queue.put(msg)
+                self.gui._log_lines.append(self.format(record))
+                if not self.gui._log_flush_scheduled.is_set():
+                    self.gui._log_flush_scheduled.set()
+                    try:
+                        self.gui.root.after(self.gui.log_flush_interval, self.gui._flush_log_batch)
+                    except (tk.TclError, RuntimeError):
+                        # Tcl未以多線程編譯或視窗已關閉，交由_poll_log_batch處理
+                        self.gui._log_flush_scheduled.clear()
+
+        # 日誌器只需將紀錄放入隊列，格式化和UI更新由監聽線程負責
+        self.queue_handler = QueueHandler(self.log_queue)
+        logger = logging.getLogger('weibo')
+        logger.addHandler(self.queue_handler)
 
-        # 創建GUI日誌處理器
-        gui_handler = GUILogHandler(self)
-        gui_handler.setLevel(logging.INFO)
-        gui_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        tk_handler = TkEmitHandler(self)
+        tk_handler.setLevel(logging.INFO)
+        tk_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 
-        # 獲取應用程序日誌器並添加處理器
-        logger = logging.getLogger('weibo')
-        logger.addHandler(gui_handler)
+        self.log_listener = QueueListener(self.log_queue, tk_handler, respect_handler_level=True)
+        self.log_listener.start()
 
-        # 開始日誌監視線程
-        self.log_monitor_thread = threading.Thread(target=self._monitor_log_queue, daemon=True)
-        self.log_monitor_thread.start()
+        # 備援輪詢，防止遺漏排程
+        self.root.after(self.event_poll_interval, self._poll_log_batch)
 
-    def _monitor_log_queue(self):
-        """監視日誌隊列並更新UI"""
+    def on_close(self):
+        """關閉視窗時停止背景工作"""
+        self.is_running = False
+        self.stop_event.set()
+        self.schedule_manager.stop_scheduler()
+        self.schedule_manager.flush()
+        logging.getLogger('weibo').removeHandler(self.queue_handler)
+        # 監聽線程可能正等待主線程處理after_idle，不能在主線程join
+        threading.Thread(target=self.log_listener.stop, daemon=True).start()
+        self.root.destroy()
+
+    def _flush_log_batch(self):
+        """取出暫存的日誌並一次性更新UI"""
+        self._log_flush_scheduled.clear()
+        msgs = []
         while True:
             try:
-                while not self.log_queue.empty():
-                    msg = self.log_queue.get_nowait()
-                    self.log_text.insert(tk.END, msg + '\n')
-                    self.log_text.see(tk.END)
-            except Exception:
-                pass
-            # 小延遲避免CPU過載
-            import time
-            time.sleep(0.1)
+                msgs.append(self._log_lines.popleft())
+            except IndexError:
+                break
+
+        if msgs:
+            self._log_ring.extend(msgs)
+            if self._tab_built['log']:
+                self._append_log_lines(msgs)
+            else:
+                # 日誌頁面尚未建立，先暫存
+                self._log_backlog.extend(msgs)
+
+    def _poll_log_batch(self):
+        """定期寫入日誌，作為after排程失敗時的備援"""
+        # 監聽線程已以阻塞方式等待日誌，這裡只處理漏排程的批次
+        if self._log_lines and not self._log_flush_scheduled.is_set():
+            self._flush_log_batch()
+        self.root.after(self.event_poll_interval, self._poll_log_batch)
+
+    def _append_log_lines(self, msgs):
+        """一次性將多行日誌寫入日誌區域"""
+        # 只有在使用者停留於底部時才自動捲動
+        pinned = self.log_text.yview()[1] >= 1.0
+        self.log_text.configure(state='normal')
+        self.log_text.insert(tk.END, "\n".join(msgs) + "\n")
+
+        # 超過上限時刪除最舊的行
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > self.max_log_lines:
+            self.log_text.delete('1.0', f'{line_count - self.max_log_lines}.0')
+
+        self.log_text.configure(state='disabled')
+        if pinned:
+            self.log_text.see(tk.END)
 
     def log_message(self, msg):
         """記錄訊息到日誌"""
@@ -447,7 +779,10 @@ class WeiboCrawlerGUI:
 
     def clear_log(self):
         """清空日誌"""
+        self.log_text.configure(state='normal')
         self.log_text.delete(1.0, tk.END)
+        self.log_text.configure(state='disabled')
+        self._log_ring.clear()
 
     def save_log(self):
         """儲存日誌到文件"""
@@ -457,8 +792,21 @@ class WeiboCrawlerGUI:
             filetypes=[("Log files", "*.log"), ("Text files", "*.txt"), ("All files", "*.*")]
         )
         if filename:
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(self.log_text.get(1.0, tk.END))
+            # 直接寫出日誌副本，不經過文字區域；寫檔在背景線程進行
+            lines = list(self._log_ring)
+            future = self._cfg_executor.submit(self._write_log_file, filename, lines)
+            future.add_done_callback(self._on_log_saved)
+
+    def _write_log_file(self, filename, lines):
+        """將日誌行寫入文件"""
+        with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.writelines(line + '\n' for line in lines)
+
+    def _on_log_saved(self, future):
+        """記錄儲存日誌的錯誤"""
+        error = future.exception()
+        if error is not None:
+            logging.getLogger('weibo').error(f"儲存日誌失敗: {error}")
 
     def check_auto_start(self):
         """檢查自動啟動"""
@@ -468,33 +816,37 @@ class WeiboCrawlerGUI:
             self.status_var.set("準備自動啟動")
 
             # 顯示倒計時
-            self.countdown_var.set("3秒後自動開始...")
-            self.root.after(1000, lambda: self.countdown_var.set("2秒後自動開始..."))
-            self.root.after(2000, lambda: self.countdown_var.set("1秒後自動開始..."))
-            self.root.after(3000, self.perform_auto_start)
+            self._tick_countdown(3)
         else:
             self.log_message("就緒，等待手動操作")
 
+    def _tick_countdown(self, n):
+        """每秒更新一次倒計時，歸零後自動啟動"""
+        if n <= 0:
+            self._countdown_id = None
+            self.countdown_var.set("")
+            self.perform_auto_start()
+            return
+        self.countdown_var.set(f"{n}秒後自動開始...")
+        self._countdown_id = self.root.after(1000, self._tick_countdown, n - 1)
+
+    def cancel_countdown(self):
+        """取消自動啟動倒計時"""
+        if self._countdown_id is not None:
+            self.root.after_cancel(self._countdown_id)
+            self._countdown_id = None
+            self.countdown_var.set("")
+            self.status_var.set("就緒")
+            self.log_message("已取消自動啟動")
+
     def perform_auto_start(self):
         """執行自動啟動"""
         self.log_message("執行自動啟動...")
         self.start_crawling()
 
-    def start_scheduler_thread(self):
-        """啟動排程監視線程"""
-        def run_scheduler():
-            while not self.is_running:
-                self.schedule_manager.run_pending()
-                time.sleep(1)
-
-        self.scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-        self.scheduler_thread.start()
-        self.log_message("排程服務已啟動")
-
     def create_schedule_tab(self):
         """創建排程管理頁面"""
-        schedule_frame = ttk.Frame(self.notebook)
-        self.notebook.add(schedule_frame, text="排程管理")
+        schedule_frame = self._tab_frames['schedule']
 
         # 自動模式設定
         auto_frame = ttk.LabelFrame(schedule_frame, text="自動模式設定", padding=10)
@@ -511,6 +863,7 @@ class WeiboCrawlerGUI:
         # 創建表格
         columns = ("ID", "用戶", "時間", "類型", "狀態", "最後執行")
         self.schedule_tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=8)
+        self._schedule_row_by_id = {}  # 排程ID -> Treeview item
 
         # 設定欄位標題
         for col in columns:
@@ -533,6 +886,8 @@ class WeiboCrawlerGUI:
         ttk.Button(btn_frame, text="刪除排程", command=self.delete_schedule).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="重新載入", command=self.refresh_schedules).pack(side=tk.RIGHT, padx=5)
 
+        self._tab_built['schedule'] = True
+
         # 載入排程列表
         self.refresh_schedules()
 
@@ -549,6 +904,7 @@ class WeiboCrawlerGUI:
             self.log_message("自動啟動已啟用")
         else:
             # 停用自動啟動
+            self.cancel_countdown()
             self.session_manager.save_session(
                 config={},
                 auto_start_enabled=False
@@ -582,7 +938,6 @@ class WeiboCrawlerGUI:
 
     def select_time_type(self):
         """選擇時間類型"""
-        from tkinter import simpledialog
         types = ["daily", "weekly", "monthly"]
         type_str = simpledialog.askstring("選擇類型",
                                          "請選擇排程類型:\n1. daily - 每日\n2. weekly - 每週\n3. monthly - 每月",
@@ -620,33 +975,45 @@ class WeiboCrawlerGUI:
             messagebox.showerror("錯誤", "刪除排程失敗")
 
     def refresh_schedules(self):
-        """重新載入排程列表"""
-        # 清空樹狀圖
-        for item in self.schedule_tree.get_children():
-            self.schedule_tree.delete(item)
+        """重新載入排程列表（只更新有變動的列）"""
+        if not self._tab_built['schedule']:
+            return
 
-        # 載入排程
         schedules = self.schedule_manager.get_schedules()
-        for s in schedules:
-            status = "啟用" if s.get("enabled", True) else "停用"
-            last_run = s.get("last_run", "從未")
-            if last_run != "從未":
-                last_run = last_run[:19]  # 簡化時間顯示
-
-            self.schedule_tree.insert("", tk.END, values=(
-                s["id"],
-                s["user_id"],
-                s["schedule_time"],
-                s["schedule_type"],
-                status,
-                last_run
-            ))
+
+        # 在迴圈外一次性建立所有列的顯示值，皆轉為字串以便與Treeview回傳值比較
+        status_map = {True: "啟用", False: "停用"}
+        rows = {
+            str(s["id"]): (
+                str(s["id"]),
+                str(s["user_id"]),
+                str(s["schedule_time"]),
+                str(s["schedule_type"]),
+                status_map[bool(s.get("enabled", True))],
+                str(s["last_run"])[:19] if s.get("last_run") else "從未",  # 簡化時間顯示
+            )
+            for s in schedules
+        }
+
+        # 刪除已不存在的排程
+        stale = [sid for sid in self._schedule_row_by_id if sid not in rows]
+        if stale:
+            self.schedule_tree.delete(*(self._schedule_row_by_id.pop(sid) for sid in stale))
+
+        for schedule_id, values in rows.items():
+            iid = self._schedule_row_by_id.get(schedule_id)
+            if iid is None:
+                self._schedule_row_by_id[schedule_id] = self.schedule_tree.insert(
+                    "", tk.END, iid=schedule_id, values=values)
+            elif tuple(map(str, self.schedule_tree.item(iid, "values"))) != values:
+                self.schedule_tree.item(iid, values=values)
 
         self.log_message(f"已載入 {len(schedules)} 個排程任務")
 
     def create_statistics_tab(self):
         """創建統計儀表板頁面"""
         stats_frame = ttk.Frame(self.notebook)
+        self._stats_frame = stats_frame
         self.notebook.add(stats_frame, text="Statistics Dashboard")
 
         # 統計總覽區域
@@ -668,7 +1035,7 @@ class WeiboCrawlerGUI:
             row = i // 3
             col = (i % 3) * 2
             ttk.Label(summary_frame, text=f"{label_text}:").grid(row=row, column=col, sticky="e", padx=5, pady=2)
-            self.summary_labels[key] = ttk.Label(summary_frame, text="0", font=("Microsoft YaHei", 10, "bold"))
+            self.summary_labels[key] = ttk.Label(summary_frame, text="0", font="BoldFont")
             self.summary_labels[key].grid(row=row, column=col+1, sticky="w", padx=5, pady=2)
 
         # 圖表區域
@@ -688,21 +1055,12 @@ class WeiboCrawlerGUI:
 
         for text, value in chart_types:
             ttk.Radiobutton(chart_controls, text=text, variable=self.chart_type_var,
-                          value=value, command=self.update_chart).pack(side=tk.LEFT, padx=10)
-
-        # 圖表顯示區域
-        if MATPLOTLIB_AVAILABLE:
-            self.figure = Figure(figsize=(8, 5), dpi=100, facecolor='#F8F9FA')
-            self.canvas_frame = ttk.Frame(chart_frame)
-            self.canvas_frame.pack(fill=tk.BOTH, expand=True)
-            self.canvas = FigureCanvasTkAgg(self.figure, master=self.canvas_frame)
-            self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-            # 創建初始圖表
-            self.update_chart()
-        else:
-            ttk.Label(chart_frame, text="圖表功能未啟用：matplotlib 未安裝",
-                     foreground="red").pack(expand=True)
+                          value=value, command=self._on_chart_type_changed).pack(side=tk.LEFT, padx=10)
+
+        # 圖表顯示區域，首次切換到此頁面時才建立
+        self.chart_frame = chart_frame
+        self.figure = None
+        self._chart_key = None  # 目前畫布上的圖表類型及其數據版本
 
         # 最新會話顯示
         sessions_frame = ttk.LabelFrame(stats_frame, text="Recent Sessions", padding=10)
@@ -711,6 +1069,7 @@ class WeiboCrawlerGUI:
         # 創建會話表格
         columns = ("Start Time", "User", "Status", "Weibos", "Images", "Efficiency")
         self.sessions_tree = ttk.Treeview(sessions_frame, columns=columns, show="headings", height=6)
+        self._sessions_rows = []  # 目前表格中顯示的各列值
 
         # 設定欄位標題
         column_widths = [140, 100, 80, 80, 80, 80]
@@ -729,19 +1088,114 @@ class WeiboCrawlerGUI:
         stats_btn_frame = ttk.Frame(stats_frame)
         stats_btn_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        ttk.Button(stats_btn_frame, text="Refresh Stats", command=self.refresh_statistics).pack(side=tk.LEFT, padx=5)
+        ttk.Button(stats_btn_frame, text="Refresh Stats", command=lambda: self.refresh_statistics(force=True)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(stats_btn_frame, text="Export Chart", command=self.export_chart).pack(side=tk.LEFT, padx=5)
         ttk.Button(stats_btn_frame, text="Clean Old Data", command=self.cleanup_old_data).pack(side=tk.RIGHT, padx=5)
 
         # 載入初始統計數據
         self.refresh_statistics()
 
-    def update_chart(self):
-        """更新圖表顯示"""
-        if not MATPLOTLIB_AVAILABLE:
+    def _init_chart_artists(self):
+        """建立各圖表固定使用的座標軸和圖形元素，之後只更新數據"""
+        fig = self.figure
+        # 固定邊距只設定一次，保留旋轉刻度標籤和右側副軸標籤的空間，不在每次刷新時重新計算佈局
+        fig.subplots_adjust(left=0.08, right=0.9, top=0.9, bottom=0.25, wspace=0.3)
+
+        # 每日趨勢：柱狀圖 + 效率折線（雙軸）
+        ax_daily = fig.add_subplot(1, 1, 1, label="daily")
+        ax_daily_twin = ax_daily.twinx()
+        ax_daily.set_title("每日爬取統計", fontsize=12, fontweight='bold')
+        ax_daily.set_xlabel("日期")
+        ax_daily.set_ylabel('微博數', color='#4A90E2')
+        ax_daily.tick_params(axis='y', labelcolor='#4A90E2')
+        ax_daily_twin.set_ylabel('效率 (微博/分鐘)', color='red')
+        ax_daily_twin.tick_params(axis='y', labelcolor='red')
+        self.line_eff, = ax_daily_twin.plot([], [], 'r-', linewidth=2, marker='o', label='效率')
+        ax_daily.legend([Patch(color='#4A90E2', alpha=0.7), self.line_eff],
+                        ['微博數', '效率'], loc='upper left')
+        self.bars_daily = None
+
+        # 用戶統計：微博數柱狀圖 + 平均成功率圓餅圖
+        ax_user = fig.add_subplot(1, 2, 1, label="user_bar")
+        ax_user_pie = fig.add_subplot(1, 2, 2, label="user_pie")
+        ax_user.set_title("用戶微博數量")
+        ax_user.set_ylabel("微博數")
+        self.bars_user = None
+        self.bar_labels_user = []
+        self.pie_user = None
+
+        # 效能指標：三條折線
+        ax_perf = fig.add_subplot(1, 1, 1, label="performance")
+        ax_perf.set_title("效能指標趨勢", fontsize=12, fontweight='bold')
+        ax_perf.set_xlabel("時間")
+        ax_perf.set_ylabel("數值")
+        ax_perf.grid(True, alpha=0.3)
+        self.perf_lines = (
+            ax_perf.plot([], [], 'b-', linewidth=1.5, marker='o', markersize=3, antialiased=False, label='記憶體使用量 (MB)')[0],
+            ax_perf.plot([], [], 'g-', linewidth=1.5, marker='s', markersize=3, antialiased=False, label='網路速度 (KB/s)')[0],
+            ax_perf.plot([], [], 'r-', linewidth=1.5, marker='^', markersize=3, antialiased=False, label='CPU使用率 (%)')[0],
+        )
+        ax_perf.legend(loc='upper right')
+
+        # 無數據時顯示的座標軸
+        ax_empty = fig.add_subplot(1, 1, 1, label="empty")
+        ax_empty.set_axis_off()
+        ax_empty.text(0.5, 0.5, "無數據可顯示", transform=ax_empty.transAxes, ha="center", va="center",
+                      fontsize=14, color="gray")
+        self.empty_title = ax_empty.set_title("", fontsize=12, fontweight='bold')
+
+        self.chart_axes = {
+            "daily_trend": (ax_daily, ax_daily_twin),
+            "user_stats": (ax_user, ax_user_pie),
+            "performance": (ax_perf,),
+            "empty": (ax_empty,),
+        }
+        for axes in self.chart_axes.values():
+            for ax in axes:
+                ax.set_visible(False)
+
+    def _show_chart_axes(self, key):
+        """只顯示指定圖表的座標軸"""
+        for name, axes in self.chart_axes.items():
+            for ax in axes:
+                ax.set_visible(name == key)
+
+    def _show_empty_chart(self, title):
+        """顯示無數據提示"""
+        self.empty_title.set_text(title)
+        self._show_chart_axes("empty")
+
+    def _build_chart(self):
+        """載入matplotlib並建立圖表畫布"""
+        if not ensure_matplotlib():
+            ttk.Label(self.chart_frame, text="圖表功能未啟用：matplotlib 未安裝",
+                     foreground="red").pack(expand=True)
+            return
+
+        self.figure = Figure(figsize=(8, 5), dpi=100, facecolor='#F8F9FA')
+        self.canvas_frame = ttk.Frame(self.chart_frame)
+        self.canvas_frame.pack(fill=tk.BOTH, expand=True)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.canvas_frame)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self._init_chart_artists()
+
+        # 創建初始圖表
+        self.update_chart()
+
+    def update_chart(self, force=False):
+        """更新圖表顯示，圖表類型和數據版本都未變且非手動刷新時跳過"""
+        if not MATPLOTLIB_AVAILABLE or self.figure is None:
             return
 
         chart_type = self.chart_type_var.get()
-        self.figure.clear()
+        group = 'sessions'
+        if chart_type == "performance":
+            # 先寫入暫存的效能指標，數據版本才會反映最新的取樣
+            self.stats_manager.flush_metrics()
+            group = 'metrics'
+        chart_key = (chart_type, self.stats_manager.data_version(group))
+        if not force and chart_key == self._chart_key:
+            return
 
         try:
             if chart_type == "daily_trend":
@@ -751,136 +1205,167 @@ class WeiboCrawlerGUI:
             elif chart_type == "performance":
                 self._create_performance_chart()
 
-            self.canvas.draw()
+            # 合併到閒置時重繪一次
+            self.canvas.draw_idle()
+            self._chart_key = chart_key
         except Exception as e:
             self.log_message(f"圖表更新失敗: {e}")
 
+    def _on_chart_type_changed(self):
+        """切換圖表類型，重複點選目前的類型時不重新查詢和重繪"""
+        self.update_chart()
+
     def _create_daily_trend_chart(self):
-        """創建每日趨勢圖表"""
+        """更新每日趨勢圖表"""
         data = self.stats_manager.get_daily_chart_data()
 
         if not data:
-            ax = self.figure.add_subplot(111)
-            ax.text(0.5, 0.5, "無數據可顯示", transform=ax.transAxes, ha="center", va="center",
-                   fontsize=14, color="gray")
-            ax.set_title("每日爬取趨勢", fontsize=12, fontweight='bold')
+            self._show_empty_chart("每日爬取趨勢")
             return
 
-        ax1 = self.figure.add_subplot(111)
-
-        # 提取數據
-        dates = [row[0] for row in data]
-        weibo_counts = [row[2] for row in data]
-        efficiency = [row[5] for row in data]
-
-        # 繪製雙軸圖
-        bars = ax1.bar(dates, weibo_counts, alpha=0.7, color='#4A90E2', label='微博數')
-        ax1.set_ylabel('微博數', color='#4A90E2')
-        ax1.tick_params(axis='y', labelcolor='#4A90E2')
-
-        ax2 = ax1.twinx()
-        line = ax2.plot(dates, efficiency, 'r-', linewidth=2, marker='o', label='效率')
-        ax2.set_ylabel('效率 (微博/分鐘)', color='red')
-        ax2.tick_params(axis='y', labelcolor='red')
+        ax1, ax2 = self.chart_axes["daily_trend"]
+
+        # 提取數據，直接逐列填入結構化陣列，不經過中間的物件陣列
+        rec = np.fromiter(((row[0], row[2] or 0, row[5] or 0) for row in data),
+                          dtype=[('date', object), ('weibos', np.int64), ('eff', np.float64)],
+                          count=len(data))
+        dates = rec['date'].tolist()
+        weibo_counts = rec['weibos']
+        efficiency = rec['eff']
+        x = np.arange(len(dates))
+
+        # 柱數相同時只更新高度，否則重建柱狀圖
+        if self.bars_daily is not None and len(self.bars_daily) == len(dates):
+            for bar, height in zip(self.bars_daily, weibo_counts):
+                bar.set_height(height)
+        else:
+            if self.bars_daily is not None:
+                self.bars_daily.remove()
+            self.bars_daily = ax1.bar(x, weibo_counts, alpha=0.7, color='#4A90E2')
 
-        # 設置標題和格式
-        ax1.set_title("每日爬取統計", fontsize=12, fontweight='bold')
-        ax1.set_xlabel("日期")
+        self.line_eff.set_data(x, efficiency)
 
-        # 旋轉x軸標籤
-        plt.setp(ax1.get_xticklabels(), rotation=45, ha='right')
+        ax1.set_xticks(x)
+        ax1.set_xticklabels(dates, rotation=45, ha='right')
+        for ax in (ax1, ax2):
+            ax.relim()
+            ax.autoscale_view()
 
-        # 添加圖例
-        lines1, labels1 = ax1.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax1.legend(lines1 + lines2, labels1 + labels2, loc='upper left')
+        self._show_chart_axes("daily_trend")
 
     def _create_user_stats_chart(self):
-        """創建用戶統計圖表"""
+        """更新用戶統計圖表"""
         data = self.stats_manager.get_user_chart_data()
 
         if not data:
-            ax = self.figure.add_subplot(111)
-            ax.text(0.5, 0.5, "無數據可顯示", transform=ax.transAxes, ha="center", va="center",
-                   fontsize=14, color="gray")
-            ax.set_title("用戶統計", fontsize=12, fontweight='bold')
+            self._show_empty_chart("用戶統計")
             return
 
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(8, 4))
+        ax1, ax2 = self.chart_axes["user_stats"]
 
         # 提取前10個用戶的數據
-        users = [row[0][:8] + "..." if len(row[0]) > 8 else row[0] for row in data[:10]]
-        weibo_counts = [row[1] for row in data[:10]]
-        success_rates = [row[3] * 100 for row in data[:10]]
+        arr = np.asarray(data[:10], dtype=object)
+        names = arr[:, 0].astype(str)
+        users = np.where(np.char.str_len(names) > 8, np.char.add(names.astype('U8'), '...'), names).tolist()
+        weibo_counts = arr[:, 1].astype(np.int64)
+        success_rates = arr[:, 3].astype(np.float64) * 100
+        x = np.arange(len(users))
 
         # 微博數量柱狀圖
-        bars = ax1.bar(range(len(users)), weibo_counts, color='#28A745', alpha=0.7)
-        ax1.set_title("用戶微博數量")
-        ax1.set_xticks(range(len(users)))
+        if self.bars_user is not None and len(self.bars_user) == len(users):
+            for bar, height in zip(self.bars_user, weibo_counts):
+                bar.set_height(height)
+        else:
+            if self.bars_user is not None:
+                self.bars_user.remove()
+            self.bars_user = ax1.bar(x, weibo_counts, color='#28A745', alpha=0.7)
+        ax1.set_xticks(x)
         ax1.set_xticklabels(users, rotation=45, ha='right')
-        ax1.set_ylabel("微博數")
+        ax1.relim()
+        ax1.autoscale_view()
 
         # 添加數值標籤
-        for bar, count in zip(bars, weibo_counts):
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{count}', ha='center', va='bottom', fontsize=8)
+        for label in self.bar_labels_user:
+            label.remove()
+        self.bar_labels_user = [
+            ax1.text(bar.get_x() + bar.get_width()/2., bar.get_height(),
+                     f'{count}', ha='center', va='bottom', fontsize=8)
+            for bar, count in zip(self.bars_user, weibo_counts)
+        ]
 
         # 成功率圓餅圖
-        success_data = sum(success_rates) / len(success_rates)
-        fail_data = 100 - success_data
-
-        ax2.pie([success_data, fail_data], labels=['成功', '失敗'],
-               autopct='%1.1f%%', colors=['#28A745', '#DC3545'], startangle=90)
-        ax2.set_title("平均成功率")
+        success_data = float(success_rates.mean())
+        self._update_success_pie(ax2, (success_data, 100 - success_data))
 
-        plt.tight_layout()
-        plt.figure(self.figure.number)  # 確保我們在正確的figure上工作
-        self.figure.clear()
-        self.figure = fig
-
-    def _create_performance_chart(self):
-        """創建效能指標圖表"""
-        data = self.stats_manager.get_performance_metrics()
+        self._show_chart_axes("user_stats")
 
-        if not data:
-            ax = self.figure.add_subplot(111)
-            ax.text(0.5, 0.5, "無數據可顯示", transform=ax.transAxes, ha="center", va="center",
-                   fontsize=14, color="gray")
-            ax.set_title("效能指標", fontsize=12, fontweight='bold')
+    def _update_success_pie(self, ax, values):
+        """更新成功率圓餅圖，楔形只建立一次，之後調整角度和文字位置"""
+        if self.pie_user is None:
+            self.pie_user = ax.pie(values, labels=['成功', '失敗'], autopct='%1.1f%%',
+                                   colors=['#28A745', '#DC3545'], startangle=90)
+            ax.set_title("平均成功率")
             return
 
-        ax1 = self.figure.add_subplot(111)
-
-        # 提取數據
-        timestamps = [row[0][:19] for row in data]  # 簡化時間顯示
-        memory_usage = [row[1] or 0 for row in data]
-        network_speed = [row[2] or 0 for row in data]
-        cpu_usage = [row[3] or 0 for row in data]
-
-        # 繪製多線圖
-        ax1.plot(timestamps, memory_usage, 'b-', linewidth=1.5, marker='o', markersize=3, label='記憶體使用量 (MB)')
-        ax1.plot(timestamps, network_speed, 'g-', linewidth=1.5, marker='s', markersize=3, label='網路速度 (KB/s)')
-        ax1.plot(timestamps, cpu_usage, 'r-', linewidth=1.5, marker='^', markersize=3, label='CPU使用率 (%)')
-
-        ax1.set_title("效能指標趨勢", fontsize=12, fontweight='bold')
-        ax1.set_xlabel("時間")
-        ax1.set_ylabel("數值")
-        ax1.legend(loc='upper right')
+        # 與 Axes.pie 相同的佈局：標籤距離1.1，百分比文字距離0.6
+        wedges, texts, autotexts = self.pie_user
+        theta1 = 90.0
+        for wedge, text, autotext, value in zip(wedges, texts, autotexts, values):
+            theta2 = theta1 + 360.0 * value / 100
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+            mid = np.deg2rad((theta1 + theta2) / 2)
+            x, y = np.cos(mid), np.sin(mid)
+            text.set_position((1.1 * x, 1.1 * y))
+            text.set_horizontalalignment('left' if x > 0 else 'right')
+            autotext.set_position((0.6 * x, 0.6 * y))
+            autotext.set_text(f'{value:.1f}%')
+            theta1 = theta2
 
-        # 旋轉x軸標籤
-        plt.setp(ax1.get_xticklabels(), rotation=45, ha='right')
-
-        # 設置網格
-        ax1.grid(True, alpha=0.3)
+    def _create_performance_chart(self):
+        """更新效能指標圖表"""
+        # 查詢結果逐列直接填入結構化陣列，None 補 0，不先建立整個結果列表；
+        # 時間欄位為定長字串，寫入時即截去毫秒，簡化時間顯示
+        rows = self.stats_manager.iter_performance_metrics()
+        rec = np.fromiter(((row[0], row[1] or 0, row[2] or 0, row[3] or 0) for row in rows),
+                          dtype=[('t', 'U19'), ('memory', np.float64), ('network', np.float64), ('cpu', np.float64)])
+
+        if not rec.size:
+            self._show_empty_chart("效能指標")
+            return
 
-    def refresh_statistics(self):
-        """刷新統計數據顯示"""
+        ax1, = self.chart_axes["performance"]
+        timestamps = rec['t']
+        x = np.arange(len(timestamps))
+
+        for line, field in zip(self.perf_lines, ('memory', 'network', 'cpu')):
+            line.set_data(x, rec[field])
+
+        # 最多標示約10個時間點，避免標籤重疊
+        step = max(1, len(timestamps) // 10)
+        ax1.set_xticks(x[::step])
+        ax1.set_xticklabels(timestamps[::step].tolist(), rotation=45, ha='right')
+        ax1.relim()
+        ax1.autoscale_view()
+
+        self._show_chart_axes("performance")
+
+    def refresh_statistics(self, force=False):
+        """請求刷新統計數據顯示，短時間內的多次請求合併為一次"""
+        self._stats_refresh_force = self._stats_refresh_force or force
+        if self._stats_refresh_id is None:
+            self._stats_refresh_id = self.root.after(self.stats_refresh_delay, self._do_refresh_statistics)
+
+    def _do_refresh_statistics(self):
+        """刷新統計數據顯示，各部分內容未變化且非手動刷新時不重繪"""
+        force = self._stats_refresh_force
+        self._stats_refresh_id = None
+        self._stats_refresh_force = False
         try:
-            # 獲取總結統計
+            # 獲取總結統計，只有總結標籤依此判斷是否需要更新
             summary_stats = self.stats_manager.get_summary_stats()
-
-            if summary_stats:
+            stats_key = tuple(summary_stats.items()) if summary_stats else ()
+            if summary_stats and (force or stats_key != self._last_stats_key):
                 self.summary_labels['total_sessions'].config(text=str(summary_stats['total_sessions']))
                 self.summary_labels['total_weibos'].config(text=str(summary_stats['total_weibos']))
                 self.summary_labels['total_images'].config(text=str(summary_stats['total_images']))
@@ -888,40 +1373,79 @@ class WeiboCrawlerGUI:
 
                 avg_eff = summary_stats['avg_efficiency']
                 self.summary_labels['avg_efficiency'].config(
-                    text=".1f" if avg_eff else "0")
+                    text=f"{avg_eff:.1f}" if avg_eff else "0")
 
                 self.summary_labels['unique_users'].config(text=str(summary_stats['unique_users']))
+            self._last_stats_key = stats_key
 
-            # 刷新會話列表
+            # 會話列表與圖表各自比較內容，執行中會話的進度不會反映在總結統計中
             self._refresh_sessions_tree()
-
-            # 刷新圖表
-            self.update_chart()
+            self.update_chart(force)
 
         except Exception as e:
             self.log_message(f"刷新統計失敗: {e}")
 
     def _refresh_sessions_tree(self):
         """刷新會話樹狀圖"""
-        # 清空樹狀圖
-        for item in self.sessions_tree.get_children():
-            self.sessions_tree.delete(item)
-
         # 載入最近會話
         sessions = self.stats_manager.get_recent_sessions(limit=20)
 
-        for session in sessions:
-            # 格式化顯示
-            start_time = session['start_time'][:19] if session['start_time'] else "未知"
-            user_id = session['user_id'][:10] if session['user_id'] else "未知"
-            status = session['status'] or "未知"
-            weibo_count = str(session['total_weibos'])
-            image_count = str(session['image_count'])
-            efficiency = ".1f" if session['efficiency'] else "0"
+        # 格式化顯示
+        rows = [(
+            f"{session['start_time']:.19}" if session['start_time'] else "未知",
+            f"{session['user_id']:.10}" if session['user_id'] else "未知",
+            session['status'] or "未知",
+            str(session['total_weibos']),
+            str(session['image_count']),
+            f"{session['efficiency']:.1f}" if session['efficiency'] else "0",
+        ) for session in sessions]
+
+        # 與上次顯示的內容在Python端比較，沒有變化時不呼叫Tcl
+        old_rows = self._sessions_rows
+        if rows == old_rows:
+            return
+
+        # 重用現有的列，只更新內容改變的列，避免整表刪除重建
+        old_items = self.sessions_tree.get_children()
+        for i, row in enumerate(rows):
+            if i >= len(old_items):
+                self.sessions_tree.insert("", tk.END, values=row)
+            elif row != old_rows[i]:
+                self.sessions_tree.item(old_items[i], values=row)
+        if len(old_items) > len(rows):
+            self.sessions_tree.delete(*old_items[len(rows):])
+        self._sessions_rows = rows
+
+    def export_chart(self):
+        """將目前畫布上的圖表匯出為圖片"""
+        if not MATPLOTLIB_AVAILABLE or self.figure is None:
+            messagebox.showwarning("Warning", "圖表尚未建立")
+            return
+
+        filename = filedialog.asksaveasfilename(
+            title="匯出圖表",
+            defaultextension=".png",
+            filetypes=[("PNG files", "*.png"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+
+        try:
+            self.save_chart_image(filename)
+            self.log_message(f"圖表已匯出: {filename}")
+        except Exception as e:
+            messagebox.showerror("錯誤", f"匯出圖表失敗: {e}")
 
-            self.sessions_tree.insert("", tk.END, values=(
-                start_time, user_id, status, weibo_count, image_count, efficiency
-            ))
+    def save_chart_image(self, path):
+        """直接使用Agg畫布已渲染的像素緩衝區存檔，不重新渲染整個圖表"""
+        from PIL import Image  # matplotlib 的必要依賴
+
+        # 只有在有尚未繪製的變更時才同步重繪
+        if self.figure.stale:
+            self.canvas.draw()
+        renderer = self.canvas.get_renderer()
+        size = (int(renderer.width), int(renderer.height))
+        Image.frombuffer('RGBA', size, self.canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1).save(path)
 
     def cleanup_old_data(self):
         """清理舊數據"""
@@ -944,17 +1468,8 @@ class WeiboCrawlerGUI:
                 return None, None
 
         # 讀取用戶列表
-        users = []
         try:
-            with open(user_list_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        parts = line.split()
-                        if len(parts) >= 2 and parts[0].isdigit():
-                            user_id = parts[0]
-                            user_name = ' '.join(parts[1:])
-                            users.append((user_id, user_name))
+            users = self._load_user_list(user_list_file)[1]
         except Exception as e:
             messagebox.showerror("Error", f"Failed to read user list: {e}")
             return None, None
@@ -963,43 +1478,60 @@ class WeiboCrawlerGUI:
             messagebox.showwarning("Warning", "User list is empty.")
             return None, None
 
-        # 創建用戶選擇對話框
+        dialog, listbox, choice = self._get_user_dialog()
+
+        # 用戶列表
+        listbox.delete(0, tk.END)
+        listbox.insert(tk.END, *[f"{user_id} {user_name}" for user_id, user_name in users])
+
+        dialog.deiconify()
+        dialog.grab_set()
+
+        # 等待使用者選擇或取消，之後隱藏對話框供下次使用
+        self.root.wait_variable(choice)
+        dialog.grab_release()
+        dialog.withdraw()
+
+        index = choice.get()
+        if index < 0:
+            return None, None
+        return users[index]
+
+    def _get_user_dialog(self):
+        """建立一次用戶選擇對話框，之後隱藏重用，避免每次重建視窗和元件"""
+        if self._user_dialog is not None:
+            return self._user_dialog
+
         dialog = tk.Toplevel(self.root)
+        dialog.withdraw()
         dialog.title("Select User")
         dialog.geometry("400x300")
         dialog.transient(self.root)
-        dialog.grab_set()
 
         # 用戶列表
         listbox = tk.Listbox(dialog, height=10)
         listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        for user_id, user_name in users:
-            listbox.insert(tk.END, "2")
-
         # 按鈕
         btn_frame = ttk.Frame(dialog)
         btn_frame.pack(fill=tk.X, padx=10, pady=5)
 
-        selected_user = [None, None]
+        # 選中的列索引，-1 代表取消
+        choice = tk.IntVar(dialog, value=-1)
 
         def on_select():
             selection = listbox.curselection()
-            if selection:
-                index = selection[0]
-                selected_user[0], selected_user[1] = users[index]
-            dialog.destroy()
+            choice.set(selection[0] if selection else -1)
 
         def on_cancel():
-            dialog.destroy()
+            choice.set(-1)
 
         ttk.Button(btn_frame, text="Select", command=on_select).pack(side=tk.RIGHT, padx=5)
         ttk.Button(btn_frame, text="Cancel", command=on_cancel).pack(side=tk.RIGHT, padx=5)
+        dialog.protocol("WM_DELETE_WINDOW", on_cancel)
 
-        # 等待對話框關閉
-        self.root.wait_window(dialog)
-
-        return selected_user[0], selected_user[1]
+        self._user_dialog = (dialog, listbox, choice)
+        return self._user_dialog
 
     def select_schedule_type(self):
         """選擇排程類型"""
@@ -1009,7 +1541,7 @@ class WeiboCrawlerGUI:
         dialog.transient(self.root)
         dialog.grab_set()
 
-        ttk.Label(dialog, text="Choose schedule type:", font=("Arial", 10, "bold")).pack(pady=10)
+        ttk.Label(dialog, text="Choose schedule type:", font="DialogFont").pack(pady=10)
 
         selected_type = [None]
 
@@ -1044,32 +1576,23 @@ class WeiboCrawlerGUI:
             prompt = "Enter monthly execution time (HH:MM):"
             initial = "09:00"
 
-        from tkinter import simpledialog
         time_str = simpledialog.askstring("Schedule Time", prompt, initialvalue=initial)
         return time_str
 
     def build_config_from_ui(self):
-        """從UI建立配置字典"""
-        config = {}
-        for key, var in self.config_vars.items():
-            if key == "user_id_list":
-                value = var.get()
-                config[key] = value
-            elif key.startswith("write_"):
-                # 不處理，稍後重新建立
-                pass
-            else:
-                config[key] = var.get()
+        """從UI建立配置字典，變數未被寫入時重用上次讀取的快照"""
+        if self._ui_snapshot_dirty or self._ui_snapshot is None:
+            self._ui_snapshot = {key: var.get() for key, var in self.config_vars.items()}
+            self._ui_snapshot_dirty = False
+        snapshot = self._ui_snapshot
+
+        config = {key: value for key, value in snapshot.items() if not key.startswith("write_")}
 
         # 重新建立write_mode
-        write_modes = []
-        if self.config_vars["write_csv"].get():
-            write_modes.append("csv")
-        if self.config_vars["write_json"].get():
-            write_modes.append("json")
-        if self.config_vars["write_sqlite"].get():
-            write_modes.append("sqlite")
-        config["write_mode"] = write_modes
+        config["write_mode"] = [
+            format_name for format_name in ("csv", "json", "sqlite")
+            if snapshot[f"write_{format_name}"]
+        ]
 
         return config
 
@@ -1081,21 +1604,40 @@ class WeiboCrawlerGUI:
         # 嘗試從配置中獲取用戶ID
         user_list_file = config.get("user_id_list")
         if user_list_file and os.path.exists(user_list_file):
-            try:
-                with open(user_list_file, 'r', encoding='utf-8') as f:
-                    first_line = f.readline().strip()
-                    if first_line.isdigit():
-                        user_id = first_line
-            except:
-                pass
+            user_id = self._first_user_id(user_list_file)
 
         self.session_manager.update_session_after_run(user_id)
 
-def main():
-    # 確保能正常運行GUI
-    import sys
-    import os
+    def _first_user_id(self, path):
+        """讀取用戶列表文件首行的用戶ID"""
+        try:
+            first_line = self._load_user_list(path)[0]
+        except Exception:
+            return None
+        return first_line if first_line.isdigit() else None
+
+    # 「用戶ID 用戶名稱...」格式的行
+    _USER_LINE_RE = re.compile(r'^[ \t]*(\d+)[ \t]+(\S.*?)[ \t]*\r?$', re.MULTILINE)
+
+    def _load_user_list(self, path):
+        """一次讀入用戶列表文件並解析，回傳(去除空白的首行, [(用戶ID, 用戶名稱), ...])
 
+        文件未修改時使用緩存，選擇用戶和更新會話共用同一次讀取
+        """
+        mtime = os.stat(path).st_mtime
+        cache = self._user_list_cache
+        if cache and cache[0] == path and cache[1] == mtime:
+            return cache[2], cache[3]
+
+        with open(path, 'rb') as f:
+            text = f.read().decode('utf-8-sig')
+        first_line = text.split('\n', 1)[0].strip()
+        users = [(m.group(1), ' '.join(m.group(2).split())) for m in self._USER_LINE_RE.finditer(text)]
+
+        self._user_list_cache = (path, mtime, first_line, users)
+        return first_line, users
+
+def main():
     # 設定環境
     if hasattr(sys, '_MEIPASS'):
         # 如果是打包後執行
@@ -1105,7 +1647,7 @@ def main():
     app = WeiboCrawlerGUI(root)
 
     # 設置關閉事件
-    root.protocol("WM_DELETE_WINDOW", lambda: (setattr(app, 'is_running', False), root.destroy()))
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
 
     root.mainloop()
 
@@ -5,14 +5,53 @@
 負責記憶用戶配置和自動執行的邏輯
 """
 
+import functools
 import json
 import os
+import re
 import threading
 import time
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 
+from util.fileutil import atomic_write_bytes
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+@functools.lru_cache(maxsize=None)
+def _import_schedule():
+    """首次需要排程時才匯入schedule模組，不可用時回傳None"""
+    try:
+        import schedule
+        return schedule
+    except ImportError:
+        logging.getLogger('weibo').error("schedule模組未安裝，排程功能無法使用")
+        return None
+
+
+# 微博用戶ID：8-11位ASCII數字
+_USER_ID_RE = re.compile(r'\d{8,11}', re.ASCII)
+
+
+def _dump_json_compact(data):
+    """將資料序列化為緊湊的UTF-8 JSON位元組，有無orjson時輸出相同"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _load_json_file(path):
+    """一次讀入整個JSON文件並解析"""
+    data = Path(path).read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 class SessionManager:
     def __init__(self, config_path="config.json", session_file="last_session.json"):
         self.config_path = config_path
@@ -26,12 +65,12 @@ class SessionManager:
             "config": config,
             "auto_start_enabled": auto_start_enabled,
             "saved_at": datetime.now().isoformat(),
-            "last_run": last_run.isoformat() if last_run else None
+            "last_run": last_run.isoformat() if last_run else None,
+            "last_run_ts": last_run.timestamp() if last_run else None  # 供比較用的Unix時間戳
         }
 
         try:
-            with open(self.session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, ensure_ascii=False, indent=2)
+            atomic_write_bytes(self.session_file, _dump_json_compact(session_data))
             self.logger.info("會話信息已儲存")
         except Exception as e:
             self.logger.error(f"儲存會話失敗: {e}")
@@ -42,8 +81,7 @@ class SessionManager:
             return None
 
         try:
-            with open(self.session_file, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
+            session_data = _load_json_file(self.session_file)
             self.logger.info("會話信息已載入")
             return session_data
         except Exception as e:
@@ -60,29 +98,23 @@ class SessionManager:
             return None
 
         # 檢查上次執行時間，避免過於頻繁
-        last_run_str = session.get("last_run")
-        if last_run_str:
-            last_run = datetime.fromisoformat(last_run_str)
-            time_since_last = datetime.now() - last_run
-            # 如果一小時內已經執行過，跳過自動啟動
-            if time_since_last < timedelta(hours=1):
-                self.logger.info("一小時內已執行過，跳過自動啟動")
-                return None
+        last_run_ts = session.get("last_run_ts")
+        if last_run_ts is None and session.get("last_run"):
+            # 舊版會話文件只有ISO格式時間
+            last_run_ts = datetime.fromisoformat(session["last_run"]).timestamp()
+        # 如果一小時內已經執行過，跳過自動啟動
+        if last_run_ts is not None and time.time() - last_run_ts < 3600:
+            self.logger.info("一小時內已執行過，跳過自動啟動")
+            return None
 
         return session.get("config")
 
     def is_user_available(self, user_id):
         """檢查用戶ID是否有效"""
-        # 簡單的檢查邏輯，可以根據需要擴充
-        if not user_id or not str(user_id).isdigit():
-            return False
-
-        # 檢查長度（微博用戶ID通常為8-10位）
-        user_id_str = str(user_id)
-        if len(user_id_str) < 8 or len(user_id_str) > 11:
+        # 簡單的檢查邏輯，可以根據需要擴充：純數字，長度8-11位
+        if not user_id:
             return False
-
-        return True
+        return _USER_ID_RE.fullmatch(str(user_id)) is not None
 
     def update_session_after_run(self, user_id=None):
         """更新會話，記錄執行時間"""
@@ -103,37 +135,67 @@ class ScheduleManager:
         self.logger = logging.getLogger('weibo')
         self.schedules_file = "schedules.json"
         self.schedules = []
+        self._by_id = {}  # 排程ID -> 排程項目，與self.schedules共用同一物件
+        self.save_delay = 5  # 排程執行後延遲儲存的秒數，期間多次變更合併為一次寫入
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._last_serialized = None  # 上次寫入文件的內容，相同時不重寫
+        self.max_idle_wait = 60  # 排程線程最長等待秒數，避免系統休眠等造成的時鐘偏差
+        self._scheduler_thread = None
+        self._scheduler_started = False
+        self._stop_scheduler = threading.Event()
+        self._wake = threading.Event()  # 排程變更時喚醒排程線程重新計算等待時間
         self.load_schedules()
 
-        try:
-            import schedule
-            self.schedule = schedule
-        except ImportError:
-            self.schedule = None
-            self.logger.error("schedule模組未安裝，排程功能無法使用")
+    @property
+    def schedule(self):
+        """schedule模組，未安裝時為None"""
+        return _import_schedule()
 
     def load_schedules(self):
         """載入排程配置"""
         if not os.path.exists(self.schedules_file):
             self.schedules = []
+            self._by_id = {}
             return
 
         try:
-            with open(self.schedules_file, 'r', encoding='utf-8') as f:
-                self.schedules = json.load(f)
+            self.schedules = _load_json_file(self.schedules_file)
             self.logger.info(f"已載入 {len(self.schedules)} 個排程任務")
         except Exception as e:
             self.logger.error(f"載入排程配置失敗: {e}")
             self.schedules = []
+        self._by_id = {s["id"]: s for s in self.schedules}
 
     def save_schedules(self):
-        """儲存排程配置"""
-        try:
-            with open(self.schedules_file, 'w', encoding='utf-8') as f:
-                json.dump(self.schedules, f, ensure_ascii=False, indent=2)
-            self.logger.info("排程配置已儲存")
-        except Exception as e:
-            self.logger.error(f"儲存排程配置失敗: {e}")
+        """儲存排程配置，內容與上次寫入相同時跳過"""
+        with self._save_lock:
+            try:
+                data = json.dumps(self.schedules, ensure_ascii=False, indent=2).encode('utf-8')
+                if data == self._last_serialized:
+                    return
+                atomic_write_bytes(self.schedules_file, data)
+                self._last_serialized = data
+                self.logger.info("排程配置已儲存")
+            except Exception as e:
+                self.logger.error(f"儲存排程配置失敗: {e}")
+
+    def _mark_dirty(self):
+        """標記排程已變更，在save_delay秒後統一儲存"""
+        with self._save_lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """立即寫入延遲中的變更，程式結束前呼叫"""
+        with self._save_lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+            self.save_schedules()
 
     def add_schedule(self, user_id, schedule_time, schedule_type="daily", config=None):
         """新增排程任務"""
@@ -152,12 +214,14 @@ class ScheduleManager:
         }
 
         self.schedules.append(schedule_entry)
+        self._by_id[schedule_entry["id"]] = schedule_entry
         self.save_schedules()
 
         # 如果是啟用的排程，立即應用
         if schedule_entry["enabled"]:
             self.schedule_job(schedule_entry)
 
+        self._wake.set()
         self.logger.info(f"排程任務已新增: {user_id} - {schedule_type} {schedule_time}")
         return True
 
@@ -205,6 +269,8 @@ class ScheduleManager:
 
             self.session_manager.running_schedules.add(job_id)
             self.logger.info(f"排程任務已應用: {job_id}")
+            if self._scheduler_started:
+                self._ensure_scheduler_thread()
 
         except Exception as e:
             self.logger.error(f"設定排程任務失敗 {job_id}: {e}")
@@ -228,7 +294,7 @@ class ScheduleManager:
             # 由於是在子線程執行，需要設計回呼機制
             self.logger.info(f"排程任務執行完成: {job_id}")
             schedule_entry["last_run"] = datetime.now().isoformat()
-            self.save_schedules()
+            self._mark_dirty()
 
         except Exception as e:
             self.logger.error(f"排程任務執行失敗 {job_id}: {e}")
@@ -237,24 +303,25 @@ class ScheduleManager:
 
     def remove_schedule(self, schedule_id):
         """刪除排程任務"""
-        for i, s in enumerate(self.schedules):
-            if s["id"] == schedule_id:
-                removed = self.schedules.pop(i)
-                job_id = f"{removed['id']}_{removed['user_id']}"
-
-                # 從schedule庫移除
-                if self.schedule and job_id in self.session_manager.running_schedules:
-                    try:
-                        # 移除標籤的所有任務
-                        self.schedule.clear(job_id)
-                        self.session_manager.running_schedules.discard(job_id)
-                    except:
-                        pass
-
-                self.save_schedules()
-                self.logger.info(f"排程任務已刪除: {job_id}")
-                return True
-        return False
+        removed = self._by_id.pop(schedule_id, None)
+        if removed is None:
+            return False
+        self.schedules.remove(removed)
+        job_id = f"{removed['id']}_{removed['user_id']}"
+
+        # 從schedule庫移除
+        if job_id in self.session_manager.running_schedules and self.schedule:
+            try:
+                # 移除標籤的所有任務
+                self.schedule.clear(job_id)
+                self.session_manager.running_schedules.discard(job_id)
+            except:
+                pass
+
+        self.save_schedules()
+        self._wake.set()
+        self.logger.info(f"排程任務已刪除: {job_id}")
+        return True
 
     def get_schedules(self):
         """獲取所有排程任務"""
@@ -262,42 +329,82 @@ class ScheduleManager:
 
     def update_schedule_status(self, schedule_id, enabled):
         """更新排程啟用狀態"""
-        for s in self.schedules:
-            if s["id"] == schedule_id:
-                old_status = s.get("enabled", False)
-                s["enabled"] = enabled
-                self.save_schedules()
-
-                if enabled and not old_status:
-                    self.schedule_job(s)
-                elif not enabled and old_status:
-                    # 停用排程
-                    job_id = f"{s['id']}_{s['user_id']}"
-                    if self.schedule and job_id in self.session_manager.running_schedules:
-                        try:
-                            self.schedule.clear(job_id)
-                            self.session_manager.running_schedules.discard(job_id)
-                        except:
-                            pass
-
-                self.logger.info(f"排程任務狀態已更新: {schedule_id} -> {'啟用' if enabled else '停用'}")
-                return True
-        return False
+        s = self._by_id.get(schedule_id)
+        if s is None:
+            return False
+
+        old_status = s.get("enabled", False)
+        s["enabled"] = enabled
+        self.save_schedules()
+
+        if enabled and not old_status:
+            self.schedule_job(s)
+        elif not enabled and old_status:
+            # 停用排程
+            job_id = f"{s['id']}_{s['user_id']}"
+            if job_id in self.session_manager.running_schedules and self.schedule:
+                try:
+                    self.schedule.clear(job_id)
+                    self.session_manager.running_schedules.discard(job_id)
+                except:
+                    pass
+
+        self._wake.set()
+        self.logger.info(f"排程任務狀態已更新: {schedule_id} -> {'啟用' if enabled else '停用'}")
+        return True
 
     def start_scheduler(self):
-        """啟動排程服務"""
-        if not self.schedule:
+        """啟動排程服務
+
+        沒有啟用的排程時不匯入schedule模組也不建立線程，等到第一個排程任務應用時才啟動
+        """
+        enabled = [s for s in self.schedules if s.get("enabled", False)]
+        if enabled and not self.schedule:
             self.logger.error("排程服務無法啟動：schedule模組不可用")
             return
 
+        self._scheduler_started = True
         # 應用所有啟用的排程
-        for s in self.schedules:
-            if s.get("enabled", False):
-                self.schedule_job(s)
+        for s in enabled:
+            self.schedule_job(s)
 
         self.logger.info("排程服務已啟動")
 
+    def _ensure_scheduler_thread(self):
+        """在背景線程中等待到下一個任務到期，不需要由主循環輪詢"""
+        if self._scheduler_thread is None:
+            # 每個線程使用自己的停止與喚醒事件，尚未退出的舊線程不會被重新啟動
+            self._stop_scheduler = threading.Event()
+            self._wake = threading.Event()
+            self._scheduler_thread = threading.Thread(
+                target=self._scheduler_loop, args=(self._stop_scheduler, self._wake), daemon=True)
+            self._scheduler_thread.start()
+
+    def stop_scheduler(self, timeout=1.0):
+        """停止排程線程，最多等待timeout秒讓正在執行的任務結束"""
+        self._scheduler_started = False
+        thread = self._scheduler_thread
+        self._stop_scheduler.set()
+        self._wake.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._scheduler_thread = None
+
+    def _scheduler_loop(self, stop, wake):
+        """排程線程：睡眠到下一個任務到期或排程變更，再執行到期的任務"""
+        while not stop.is_set():
+            idle = self.schedule.idle_seconds()
+            timeout = self.max_idle_wait if idle is None else min(max(idle, 0), self.max_idle_wait)
+            wake.wait(timeout)
+            wake.clear()
+            if stop.is_set():
+                break
+            try:
+                self.run_pending()
+            except Exception as e:
+                self.logger.error(f"執行排程任務失敗: {e}")
+
     def run_pending(self):
-        """執行待處理的任務（需要在主循環中呼叫）"""
+        """執行待處理的任務"""
         if self.schedule:
             self.schedule.run_pending()
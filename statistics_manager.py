@@ -6,44 +6,331 @@
 """
 
 import sqlite3
+import atexit
+import contextlib
+import functools
 import json
 import os
+import queue
 import threading
+import time
+from collections import deque
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 from pathlib import Path
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _cached_query(group):
+    """以(方法名, 參數)為鍵緩存查詢結果，group 的資料寫入後失效，見 StatisticsManager._cached"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (method.__name__, args, tuple(sorted(kwargs.items())))
+            return self._cached(key, group, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def _dump_config(config):
+    """序列化配置快照，有orjson時使用orjson，不支援的內容交回標準json；兩者輸出相同"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(config, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(config, ensure_ascii=False, separators=(',', ':'))
+
+
+def _now_us():
+    """目前時間的unix時間戳(微秒)，資料庫中的時間欄位都以此儲存"""
+    return time.time_ns() // 1000
+
+
+def _iso_sql(column, fmt='%Y-%m-%dT%H:%M:%f'):
+    """將微秒時間戳欄位轉為本地時間ISO字串的SQL表達式，只在回傳給呼叫方時使用"""
+    return f"strftime('{fmt}', {column} / 1e6, 'unixepoch', 'localtime')"
+
+
+def _epoch_us_sql(column):
+    """將舊版本地時間ISO字串欄位轉為微秒時間戳的SQL表達式(精確到毫秒)"""
+    return (f"CAST(ROUND((julianday({column}, 'utc') - 2440587.5) * 86400000) AS INTEGER)"
+            " * 1000")
+
+
+# 結構有過變更的資料表：表名 -> (建表語句, 改存微秒時間戳的欄位, 已移除的欄位)
+_REBUILT_TABLES = {
+    'crawl_sessions': ('''
+        CREATE TABLE crawl_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            start_time INTEGER NOT NULL,  -- unix時間戳(微秒)
+            end_time INTEGER,
+            status TEXT DEFAULT 'running',  -- running, completed, failed
+            total_weibos INTEGER DEFAULT 0,
+            image_count INTEGER DEFAULT 0,
+            video_count INTEGER DEFAULT 0,
+            comment_count INTEGER DEFAULT 0,
+            repost_count INTEGER DEFAULT 0,
+            duration REAL DEFAULT 0,  -- 秒數
+            efficiency REAL DEFAULT 0  -- weibos/分鐘
+        )
+    ''', ('start_time', 'end_time'), ('config_snapshot',)),
+    'performance_metrics': ('''
+        CREATE TABLE performance_metrics (
+            timestamp INTEGER PRIMARY KEY,  -- unix時間戳(微秒)，即rowid
+            memory_usage REAL,
+            network_speed REAL,
+            cpu_usage REAL,
+            error_count INTEGER DEFAULT 0,
+            retry_count INTEGER DEFAULT 0
+        )
+    ''', ('timestamp',), ()),
+}
+
+
+# 時間欄位轉回ISO字串；排序用帶表名的原欄位，才能使用索引
+_RECENT_SESSIONS_SQL = f'''
+    SELECT id, user_id, {_iso_sql('start_time')} AS start_time,
+           {_iso_sql('end_time')} AS end_time, status, total_weibos, image_count,
+           video_count, comment_count, repost_count, duration, efficiency
+    FROM crawl_sessions
+    ORDER BY crawl_sessions.start_time DESC LIMIT ?
+'''
+
+# 由已結束的會話重算用戶統計；{user_filter} 可限定只重算部分用戶
+_REBUILD_USER_STATS_SQL = f'''
+    INSERT INTO user_stats
+    (user_id, crawled_times, last_crawl, total_weibos, avg_efficiency, success_rate)
+    SELECT user_id, COUNT(*), {_iso_sql('MAX(end_time)')}, TOTAL(total_weibos),
+           AVG(efficiency), COUNT(*) FILTER (WHERE status='completed') * 1.0 / COUNT(*)
+    FROM crawl_sessions WHERE status IN ('completed', 'failed') {{user_filter}}
+    GROUP BY user_id
+    ON CONFLICT(user_id) DO UPDATE SET
+        crawled_times = excluded.crawled_times,
+        last_crawl = excluded.last_crawl,
+        total_weibos = excluded.total_weibos,
+        avg_efficiency = excluded.avg_efficiency,
+        success_rate = excluded.success_rate
+'''
+
+
+# 固定的語句文字，連線的語句緩存只需編譯一次
+_UPDATE_PROGRESS_SQL = '''
+    UPDATE crawl_sessions
+    SET total_weibos=COALESCE(?, total_weibos),
+        image_count=COALESCE(?, image_count),
+        video_count=COALESCE(?, video_count),
+        comment_count=COALESCE(?, comment_count),
+        repost_count=COALESCE(?, repost_count)
+    WHERE id=?
+'''
+
+
 class StatisticsManager:
+    SCHEMA_VERSION = 3  # 存於 PRAGMA user_version
+
     def __init__(self, db_path="weibo_stats.db"):
         self.db_path = db_path
         self.logger = logging.getLogger('weibo')
-        self.stats_cache = {}  # 緩存統計數據
-        self.lock = threading.Lock()
+        self.stats_cache = {}  # 緩存統計數據 key -> (版本, 結果)，結果由呼叫方共用，不可修改
+        self.stats_cache_size = 128  # 超過時淘汰最久未使用的查詢
+        # 各組資料表的寫入版本，寫入只讓依賴該組的緩存失效
+        self._versions = {'sessions': 0, 'metrics': 0}
+        # 讀取依賴WAL在呼叫方線程進行；寫入都交給單一寫入線程，不需要鎖
+        self._local = threading.local()  # 每個線程各自的資料庫連線
+        self._write_queue = queue.Queue()  # (寫入工作, 緩存組, Future)，None 表示停止
+        self.write_batch_size = 500  # 寫入線程每個交易最多執行的工作數
+        self._writer = None
+        self._metric_buffer = deque()  # 等待批次寫入的效能指標
+        self.metric_flush_threshold = 100  # 累積多少筆效能指標後寫入
+        self.metric_flush_interval = 5.0  # 距上次寫入超過此秒數時寫入
+        self._last_metric_flush = time.monotonic()
+        self._metric_flush_pending = threading.Event()  # 是否已有排隊中、尚未取出暫存指標的寫入
+        self._metric_flush_lock = threading.Lock()  # 檢查並設定 _metric_flush_pending 時持有
+        self.cleanup_batch_size = 10000  # 清理舊數據時每個交易最多刪除的筆數
+        self.metric_retention_days = 7  # 效能指標保留天數，每次寫入時順帶刪除過期的指標
         self.setup_database()
+        # 記憶體資料庫每個連線各自獨立，只能在呼叫方線程直接寫入
+        if self.db_path != ':memory:':
+            self._writer = threading.Thread(target=self._writer_loop, name='stats-writer',
+                                            daemon=True)
+            self._writer.start()
+        # 程式結束前寫入暫存指標；shutdown() 會撤銷註冊，不再讓 atexit 持有實例
+        atexit.register(self.shutdown)
+
+    def _connect(self):
+        """開啟資料庫連線並套用每個連線各自的PRAGMA設定"""
+        # 自動提交模式，寫入時由 _transaction 明確開始和提交交易
+        # 語句緩存以SQL文字為鍵，長期重用的連線可省去重複編譯
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False,
+                               cached_statements=256)
+        conn.row_factory = sqlite3.Row  # 列可依索引或欄位名取值，由C實作，不需逐列建立字典
+        if self.db_path != ':memory:':
+            conn.execute('PRAGMA synchronous=NORMAL')  # WAL模式下只在檢查點時fsync
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute('PRAGMA mmap_size=268435456')  # 256 MiB
+            conn.execute('PRAGMA cache_size=-20000')  # 約20 MB頁面緩存
+        return conn
+
+    def _conn(self):
+        """取得目前線程重用的資料庫連線，首次使用時建立"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self, *groups):
+        """在寫入交易中執行，提交後使 groups(預設全部)的查詢緩存失效；已在交易中時併入外層交易"""
+        conn = self._conn()
+        if conn.in_transaction:
+            yield conn.cursor()
+            return
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        self.invalidate(*groups)
+
+    def _submit(self, job, group, wait=True, args=()):
+        """把寫入工作交給寫入線程，job(cursor, *args) 在寫入交易中執行，提交後使 group 的緩存失效
+
+        wait 時等待提交完成並回傳 job 的結果(或拋出其異常)；否則立即返回，失敗時記錄日誌。
+        在寫入線程內或沒有寫入線程時直接執行，併入目前的交易
+        """
+        writer = self._writer
+        if writer is None or not writer.is_alive() or threading.current_thread() is writer:
+            with self._transaction(group) as cursor:
+                return job(cursor, *args)
+
+        # 不等待的工作不建立Future，高頻呼叫時只需一次入隊
+        future = Future() if wait else None
+        self._write_queue.put((job, args, group, future))
+        return future.result() if wait else None
+
+    def _writer_loop(self):
+        """寫入線程：取出已排隊的工作，同一批在一個交易中執行"""
+        while True:
+            item = self._write_queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.write_batch_size:
+                try:
+                    item = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._run_write_batch(batch)
+            if stop:
+                return
+
+    def _run_write_batch(self, batch):
+        """在一個交易中執行一批寫入工作；每個工作各有保存點，失敗只回滾該工作"""
+        conn = self._conn()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            outcomes, groups = self._run_jobs(conn, batch)
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            outcomes = [(future, None, e) for _, _, _, future in batch]
+            groups = set()
+        self._complete_jobs(outcomes, groups)
+
+    @staticmethod
+    def _run_jobs(conn, batch):
+        """在目前交易中逐一執行工作，回傳各工作的結果和有修改資料的緩存分組"""
+        cursor = conn.cursor()
+        outcomes = []
+        groups = set()
+        for job, args, group, future in batch:
+            conn.execute('SAVEPOINT job')
+            changes = conn.total_changes
+            try:
+                result = job(cursor, *args)
+            except Exception as e:
+                conn.execute('ROLLBACK TO job')
+                conn.execute('RELEASE job')
+                outcomes.append((future, None, e))
+            else:
+                conn.execute('RELEASE job')
+                if conn.total_changes != changes:  # 沒有修改資料的工作不使緩存失效
+                    groups.add(group)
+                outcomes.append((future, result, None))
+        return outcomes, groups
+
+    def _complete_jobs(self, outcomes, groups):
+        """提交並使緩存失效後才通知等待方，讓其讀到新數據"""
+        if groups:
+            self.invalidate(*groups)
+        for future, result, error in outcomes:
+            if future is None:
+                if error is not None:
+                    self.logger.error(f"統計數據寫入失敗: {error!r}")
+            elif error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def shutdown(self):
+        """寫入暫存的效能指標，處理完排隊的寫入後停止寫入線程"""
+        atexit.unregister(self.shutdown)
+        self.flush_metrics()
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._write_queue.put(None)
+            writer.join()
+
+    def close(self):
+        """關閉目前線程的資料庫連線"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
 
     def setup_database(self):
         """初始化統計資料庫"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        # WAL模式寫入資料庫文件後持續有效，讀取不會再阻塞寫入（不能在交易中切換）
+        if self.db_path != ':memory:':
+            self._conn().execute('PRAGMA journal_mode=WAL')
+
+        with self._transaction() as cursor:
 
-            # 爬取記錄表
+            # 配置快照表，與爬取記錄分開存放，讓爬取記錄的列保持窄小
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS crawl_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    start_time TEXT NOT NULL,
-                    end_time TEXT,
-                    status TEXT DEFAULT 'running',  -- running, completed, failed
-                    total_weibos INTEGER DEFAULT 0,
-                    image_count INTEGER DEFAULT 0,
-                    video_count INTEGER DEFAULT 0,
-                    comment_count INTEGER DEFAULT 0,
-                    repost_count INTEGER DEFAULT 0,
-                    duration REAL DEFAULT 0,  -- 秒數
-                    efficiency REAL DEFAULT 0,  -- weibos/分鐘
+                CREATE TABLE IF NOT EXISTS crawl_session_configs (
+                    id INTEGER PRIMARY KEY,  -- crawl_sessions.id
                     config_snapshot TEXT  -- JSON格式的配置快照
                 )
             ''')
+            session_columns = cursor.execute('PRAGMA table_info(crawl_sessions)').fetchall()
+            if any(column[1] == 'config_snapshot' for column in session_columns):
+                cursor.execute('''
+                    INSERT INTO crawl_session_configs (id, config_snapshot)
+                    SELECT id, config_snapshot FROM crawl_sessions
+                    WHERE config_snapshot IS NOT NULL
+                    ON CONFLICT(id) DO NOTHING
+                ''')
+
+            # 爬取記錄表和效能指標表，時間欄位為微秒時間戳；舊版結構遷移一次
+            for table, (create_sql, time_columns, dropped) in _REBUILT_TABLES.items():
+                self._create_table(cursor, table, create_sql, time_columns, dropped)
 
             # 每日統計表
             cursor.execute('''
@@ -72,303 +359,503 @@ class StatisticsManager:
                 )
             ''')
 
-            # 效能指標表
+            # 成功會話的累計總數，只有一列，供總結統計直接讀取
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS performance_metrics (
-                    timestamp TEXT PRIMARY KEY,
-                    memory_usage REAL,
-                    network_speed REAL,
-                    cpu_usage REAL,
-                    error_count INTEGER DEFAULT 0,
-                    retry_count INTEGER DEFAULT 0
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total_sessions INTEGER DEFAULT 0,
+                    total_weibos INTEGER DEFAULT 0,
+                    total_images INTEGER DEFAULT 0,
+                    total_videos INTEGER DEFAULT 0,
+                    sum_efficiency REAL DEFAULT 0  -- 效率總和，除以會話數即平均效率
                 )
             ''')
+            cursor.execute('INSERT OR IGNORE INTO totals (id) VALUES (1)')
 
-            conn.commit()
+            # 爬取記錄索引：最近會話排序/清理、成功會話彙總、按用戶分組
+            # （performance_metrics 的 timestamp 為主鍵，已有索引）
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_start '
+                           'ON crawl_sessions(start_time DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_status_date '
+                           'ON crawl_sessions(status, start_time)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user_status '
+                           'ON crawl_sessions(user_id, status)')
+
+            schema_version = cursor.execute('PRAGMA user_version').fetchone()[0]
+
+        # 舊版統計每次全量重算，口徑不同，升級時重建一次後改為增量累加
+        if schema_version < self.SCHEMA_VERSION:
+            self.rebuild_stats()
+            self._conn().execute(f'PRAGMA user_version={self.SCHEMA_VERSION}')
 
         self.logger.info("統計資料庫初始化完成")
 
+    @staticmethod
+    def _create_table(cursor, table, create_sql, time_columns, dropped):
+        """建立資料表；已有舊版結構(以TEXT儲存時間或含已移除欄位)時重建並複製資料"""
+        columns = cursor.execute(f'PRAGMA table_info({table})').fetchall()
+        if not columns:
+            cursor.execute(create_sql)
+            return
+        types = {column[1]: column[2].upper() for column in columns}
+        convert = types.get(time_columns[0]) != 'INTEGER'
+        if not convert and not any(name in types for name in dropped):
+            return
+
+        # SQLite無法修改欄位類型：改名舊表、建新表、複製資料（索引隨舊表刪除，之後重建）
+        cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_old')
+        cursor.execute(create_sql)
+        names = [column[1] for column in columns if column[1] not in dropped]
+        select = ', '.join(_epoch_us_sql(name) if convert and name in time_columns else name
+                           for name in names)
+        cursor.execute(f'INSERT INTO {table} ({", ".join(names)}) '
+                       f'SELECT {select} FROM {table}_old')
+        cursor.execute(f'DROP TABLE {table}_old')
+
+    def invalidate(self, *groups):
+        """使 groups(預設全部)的查詢緩存失效，寫入資料庫後呼叫"""
+        for group in groups or tuple(self._versions):
+            self._versions[group] += 1
+
+    def _cache_version(self, group):
+        """緩存版本：group 的寫入版本，以及目前的分鐘
+
+        寫入都經過 _transaction 遞增版本；查詢依賴目前時間(今日、最近24小時)，
+        因此緩存最多保留到下一分鐘
+        """
+        return (datetime.now().strftime('%Y%m%d%H%M'), self._versions[group])
+
+    def data_version(self, group):
+        """group 數據目前的版本，版本未變時查詢結果相同"""
+        return self._cache_version(group)
+
+    def _cached(self, key, group, query):
+        """版本未變時回傳緩存結果，否則執行查詢並緩存"""
+        version = self._cache_version(group)
+        cache = self.stats_cache
+        # 重新插入以維持字典順序即最近使用順序
+        hit = cache.pop(key, None)
+        if hit is not None and hit[0] == version:
+            cache[key] = hit
+            return hit[1]
+        result = query()
+        cache[key] = (version, result)
+        while len(cache) > self.stats_cache_size:
+            cache.pop(next(iter(cache)), None)
+        return result
+
     def start_crawl_session(self, user_id, config):
         """開始新的爬取會話"""
-        with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                start_time = datetime.now().isoformat()
+        start_time = _now_us()
+        config_snapshot = _dump_config(config)
 
-                cursor.execute('''
-                    INSERT INTO crawl_sessions
-                    (user_id, start_time, status, config_snapshot)
-                    VALUES (?, ?, ?, ?)
-                ''', (user_id, start_time, 'running', json.dumps(config)))
+        def insert(cursor):
+            cursor.execute('''
+                INSERT INTO crawl_sessions (user_id, start_time, status)
+                VALUES (?, ?, ?)
+            ''', (user_id, start_time, 'running'))
+            session_id = cursor.lastrowid
+            cursor.execute('''
+                INSERT INTO crawl_session_configs (id, config_snapshot) VALUES (?, ?)
+            ''', (session_id, config_snapshot))
+            return session_id
 
-                session_id = cursor.lastrowid
-                conn.commit()
-                return session_id
+        return self._submit(insert, 'sessions')
 
     def update_crawl_progress(self, session_id, weibo_count=None, image_count=None,
                             video_count=None, comment_count=None, repost_count=None):
-        """更新爬取進度"""
-        with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                updates = {}
-                params = []
-
-                if weibo_count is not None:
-                    updates['total_weibos'] = weibo_count
-                if image_count is not None:
-                    updates['image_count'] = image_count
-                if video_count is not None:
-                    updates['video_count'] = video_count
-                if comment_count is not None:
-                    updates['comment_count'] = comment_count
-                if repost_count is not None:
-                    updates['repost_count'] = repost_count
-
-                if updates:
-                    set_clause = ', '.join(f'{k}=?' for k in updates.keys())
-                    params.extend(updates.values())
-                    params.append(session_id)
-
-                    cursor.execute(f'''
-                        UPDATE crawl_sessions
-                        SET {set_clause}
-                        WHERE id=?
-                    ''', params)
-
-                    conn.commit()
+        """更新爬取進度，為None的欄位保持原值"""
+        counts = (weibo_count, image_count, video_count, comment_count, repost_count)
+        if all(count is None for count in counts):
+            return
+
+        # 直接以 Cursor.execute 為寫入工作，不需建立閉包；不等待寫入完成
+        self._submit(sqlite3.Cursor.execute, 'sessions', wait=False,
+                     args=(_UPDATE_PROGRESS_SQL, (*counts, session_id)))
 
     def end_crawl_session(self, session_id, status='completed'):
         """結束爬取會話"""
-        with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                end_time = datetime.now()
-
-                # 獲取開始時間並計算統計
-                cursor.execute('SELECT start_time, total_weibos FROM crawl_sessions WHERE id=?',
-                              (session_id,))
-                result = cursor.fetchone()
-
-                if result:
-                    start_time_str, total_weibos = result
-                    start_time = datetime.fromisoformat(start_time_str)
-                    duration = (end_time - start_time).total_seconds()
-                    efficiency = (total_weibos / max(duration, 1)) * 60  # weibos/分鐘
-
-                    cursor.execute('''
-                        UPDATE crawl_sessions
-                        SET end_time=?, status=?, duration=?, efficiency=?
-                        WHERE id=?
-                    ''', (end_time.isoformat(), status, duration, efficiency, session_id))
-
-                    # 更新每日統計和用戶統計
-                    self.update_daily_stats(end_time.date().isoformat())
-                    cursor.execute('SELECT user_id FROM crawl_sessions WHERE id=?', (session_id,))
-                    user_result = cursor.fetchone()
-                    if user_result:
-                        self.update_user_stats(user_result[0])
-
-                conn.commit()
-
-    def update_daily_stats(self, date):
-        """更新每日統計"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            # 計算當日統計
-            cursor.execute('''
-                SELECT COUNT(*), SUM(total_weibos), SUM(image_count), SUM(video_count), AVG(duration)
-                FROM crawl_sessions
-                WHERE DATE(start_time)=? AND status='completed'
-            ''', (date,))
+        end_time = _now_us()
 
+        def finish(cursor):
+            # 獲取開始時間並計算統計
+            cursor.execute('''
+                SELECT user_id, start_time, total_weibos, image_count, video_count
+                FROM crawl_sessions WHERE id=?
+            ''', (session_id,))
             result = cursor.fetchone()
+
             if result:
-                total_sessions, total_weibos, total_images, total_videos, avg_duration = result
-                successful_sessions = total_sessions or 0
+                user_id, start_time, total_weibos, image_count, video_count = result
+                duration = (end_time - start_time) / 1e6
+                efficiency = (total_weibos / max(duration, 1)) * 60  # weibos/分鐘
 
                 cursor.execute('''
-                    INSERT OR REPLACE INTO daily_stats
-                    (date, successful_sessions, total_weibos, total_images, total_videos, total_duration, avg_efficiency)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date, successful_sessions, total_weibos or 0, total_images or 0,
-                      total_videos or 0, avg_duration or 0,
-                      (total_weibos or 0) / max(avg_duration or 1, 1) * 60))
-
-                conn.commit()
-
-    def update_user_stats(self, user_id):
-        """更新用戶統計"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            # 計算用戶統計
+                    UPDATE crawl_sessions
+                    SET end_time=?, status=?, duration=?, efficiency=?
+                    WHERE id=?
+                ''', (end_time, status, duration, efficiency, session_id))
+
+                # 把本次會話累加到總計、每日統計(依開始時間的本地日期)和用戶統計
+                completed = status == 'completed'
+                date = datetime.fromtimestamp(start_time / 1e6).date().isoformat()
+                if completed:
+                    self._add_totals(cursor, 1, total_weibos, image_count, video_count,
+                                     efficiency)
+                    self.update_daily_stats(date, 1, total_weibos,
+                                            image_count, video_count, duration)
+                else:
+                    self.update_daily_stats(date)
+                last_crawl = datetime.fromtimestamp(end_time / 1e6).isoformat()
+                self.update_user_stats(user_id, last_crawl, total_weibos, efficiency, completed)
+
+        self._submit(finish, 'sessions')
+
+    @staticmethod
+    def _add_totals(cursor, sessions, weibos, images, videos, efficiency):
+        """累加(或以負數扣除)成功會話的總計"""
+        cursor.execute('''
+            UPDATE totals
+            SET total_sessions = total_sessions + ?,
+                total_weibos = total_weibos + ?,
+                total_images = total_images + ?,
+                total_videos = total_videos + ?,
+                sum_efficiency = sum_efficiency + ?
+            WHERE id = 1
+        ''', (sessions, weibos, images, videos, efficiency))
+
+    def update_daily_stats(self, date, successful=0, weibos=0, images=0, videos=0, duration=0):
+        """把一次結束的會話累加到每日統計，只有成功的會話計入數量和時長"""
+        def upsert(cursor):
             cursor.execute('''
-                SELECT COUNT(*), MAX(end_time), SUM(total_weibos), AVG(efficiency),
-                       COUNT(CASE WHEN status='completed' THEN 1 END) * 1.0 / COUNT(*) as success_rate
-                FROM crawl_sessions
-                WHERE user_id=?
-            ''', (user_id,))
-
-            result = cursor.fetchone()
-            if result:
-                crawled_times, last_crawl, total_weibos, avg_efficiency, success_rate = result
+                INSERT INTO daily_stats
+                (date, total_sessions, successful_sessions, total_weibos, total_images,
+                 total_videos, total_duration)
+                VALUES (?, 1, ?, ?, ?, ?, ?)
+                ON CONFLICT(date) DO UPDATE SET
+                    total_sessions = total_sessions + 1,
+                    successful_sessions = successful_sessions + excluded.successful_sessions,
+                    total_weibos = total_weibos + excluded.total_weibos,
+                    total_images = total_images + excluded.total_images,
+                    total_videos = total_videos + excluded.total_videos,
+                    total_duration = total_duration + excluded.total_duration
+            ''', (date, successful, weibos, images, videos, duration))
+            self._update_daily_efficiency(cursor, 'WHERE date=?', (date,))
+
+        self._submit(upsert, 'sessions')
+
+    @staticmethod
+    def _update_daily_efficiency(cursor, where='', params=()):
+        """依累計數據重算每日效率：總微博數 / 平均時長(分鐘)"""
+        cursor.execute('''
+            UPDATE daily_stats SET avg_efficiency = total_weibos * 60.0 / MAX(
+                CASE WHEN successful_sessions > 0
+                     THEN total_duration / successful_sessions ELSE 1 END, 1)
+        ''' + where, params)
+
+    def update_user_stats(self, user_id, last_crawl, weibos, efficiency, completed):
+        """把一次結束的會話累加到用戶統計，平均效率和成功率以累計平均更新"""
+        def upsert(cursor):
+            # DO UPDATE 中未加 excluded. 的欄位都是更新前的值
+            cursor.execute('''
+                INSERT INTO user_stats
+                (user_id, crawled_times, last_crawl, total_weibos, avg_efficiency, success_rate)
+                VALUES (?, 1, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    crawled_times = crawled_times + 1,
+                    last_crawl = MAX(IFNULL(last_crawl, ''), excluded.last_crawl),
+                    total_weibos = total_weibos + excluded.total_weibos,
+                    avg_efficiency = avg_efficiency
+                        + (excluded.avg_efficiency - avg_efficiency) / (crawled_times + 1),
+                    success_rate = (success_rate * crawled_times + excluded.success_rate)
+                        / (crawled_times + 1)
+            ''', (user_id, last_crawl, weibos, efficiency, 1.0 if completed else 0.0))
+
+        self._submit(upsert, 'sessions')
+
+    def rebuild_stats(self):
+        """由爬取記錄重建總計、每日統計和用戶統計（只計已結束的會話，執行中的會話不計入平均）"""
+        def rebuild(cursor):
+            cursor.execute('''
+                INSERT INTO totals
+                (id, total_sessions, total_weibos, total_images, total_videos, sum_efficiency)
+                SELECT 1, COUNT(*), TOTAL(total_weibos), TOTAL(image_count),
+                       TOTAL(video_count), TOTAL(efficiency)
+                FROM crawl_sessions WHERE status='completed'
+                ON CONFLICT(id) DO UPDATE SET
+                    total_sessions = excluded.total_sessions,
+                    total_weibos = excluded.total_weibos,
+                    total_images = excluded.total_images,
+                    total_videos = excluded.total_videos,
+                    sum_efficiency = excluded.sum_efficiency
+            ''')
 
-                cursor.execute('''
-                    INSERT OR REPLACE INTO user_stats
-                    (user_id, crawled_times, last_crawl, total_weibos, avg_efficiency, success_rate)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (user_id, crawled_times or 0, last_crawl, total_weibos or 0,
-                      avg_efficiency or 0, success_rate or 0))
+            cursor.execute(f'''
+                INSERT INTO daily_stats
+                (date, total_sessions, successful_sessions, total_weibos, total_images,
+                 total_videos, total_duration)
+                SELECT {_iso_sql('start_time', '%Y-%m-%d')}, COUNT(*),
+                       COUNT(*) FILTER (WHERE status='completed'),
+                       TOTAL(total_weibos) FILTER (WHERE status='completed'),
+                       TOTAL(image_count) FILTER (WHERE status='completed'),
+                       TOTAL(video_count) FILTER (WHERE status='completed'),
+                       TOTAL(duration) FILTER (WHERE status='completed')
+                FROM crawl_sessions WHERE status IN ('completed', 'failed')
+                GROUP BY 1
+                ON CONFLICT(date) DO UPDATE SET
+                    total_sessions = excluded.total_sessions,
+                    successful_sessions = excluded.successful_sessions,
+                    total_weibos = excluded.total_weibos,
+                    total_images = excluded.total_images,
+                    total_videos = excluded.total_videos,
+                    total_duration = excluded.total_duration
+            ''')
+            self._update_daily_efficiency(cursor)
+            cursor.execute(_REBUILD_USER_STATS_SQL.format(user_filter=''))
 
-                conn.commit()
+        self._submit(rebuild, 'sessions')
 
+    @_cached_query('sessions')
     def get_recent_sessions(self, limit=50):
         """獲取最近的爬取會話"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM crawl_sessions
-                ORDER BY start_time DESC LIMIT ?
-            ''', (limit,))
+        cursor = self._conn().cursor()
+        cursor.execute(_RECENT_SESSIONS_SQL, (limit,))
 
-            columns = ['id', 'user_id', 'start_time', 'end_time', 'status',
-                      'total_weibos', 'image_count', 'video_count', 'comment_count',
-                      'repost_count', 'duration', 'efficiency', 'config_snapshot']
+        # sqlite3.Row 可依欄位名取值，需要字典時再呼叫 dict(row)；配置快照見 get_session_config
+        return cursor.fetchall()
 
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    def get_session_config(self, session_id):
+        """獲取爬取會話的配置快照(JSON字串)，不存在時回傳None"""
+        row = self._conn().execute(
+            'SELECT config_snapshot FROM crawl_session_configs WHERE id=?', (session_id,)
+        ).fetchone()
+        return row[0] if row else None
 
+    @_cached_query('sessions')
     def get_daily_chart_data(self, days=30):
         """獲取每日統計圖表數據"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        cursor = self._conn().cursor()
 
-            # 獲取最近days天的數據
-            end_date = datetime.now().date()
-            start_date = end_date - timedelta(days=days)
+        # 獲取最近days天的數據
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=days)
 
-            cursor.execute('''
-                SELECT date, successful_sessions, total_weibos, total_images,
-                       total_videos, avg_efficiency
-                FROM daily_stats
-                WHERE date BETWEEN ? AND ?
-                ORDER BY date ASC
-            ''', (start_date.isoformat(), end_date.isoformat()))
+        cursor.execute('''
+            SELECT date, successful_sessions, total_weibos, total_images,
+                   total_videos, avg_efficiency
+            FROM daily_stats
+            WHERE date BETWEEN ? AND ?
+            ORDER BY date ASC
+        ''', (start_date.isoformat(), end_date.isoformat()))
 
-            return cursor.fetchall()
+        return cursor.fetchall()
 
+    @_cached_query('sessions')
     def get_user_chart_data(self, limit=20):
         """獲取用戶統計圖表數據"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        cursor = self._conn().cursor()
 
-            cursor.execute('''
-                SELECT user_id, total_weibos, crawled_times, success_rate, avg_efficiency
-                FROM user_stats
-                ORDER BY total_weibos DESC LIMIT ?
-            ''', (limit,))
+        cursor.execute('''
+            SELECT user_id, total_weibos, crawled_times, success_rate, avg_efficiency
+            FROM user_stats
+            ORDER BY total_weibos DESC LIMIT ?
+        ''', (limit,))
 
-            return cursor.fetchall()
+        return cursor.fetchall()
 
     def get_performance_metrics(self, hours=24):
-        """獲取效能指標圖表數據"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            start_time = datetime.now() - timedelta(hours=hours)
-            cursor.execute('''
-                SELECT timestamp, memory_usage, network_speed, cpu_usage
-                FROM performance_metrics
-                WHERE timestamp > ?
-                ORDER BY timestamp ASC
-            ''', (start_time.isoformat(),))
-
-            return cursor.fetchall()
+        """獲取效能指標圖表數據，先寫入暫存中的指標"""
+        self.flush_metrics()
+        return self._query_performance_metrics(hours)
+
+    def iter_performance_metrics(self, hours=24):
+        """逐列產生最近hours小時的效能指標，不建立整個結果列表，也不緩存
+
+        適合直接交給 numpy.fromiter 等一次性消費的呼叫方；應完整迭代，
+        否則讀取交易會保持開啟
+        """
+        self.flush_metrics()
+        return iter(self._performance_metrics_cursor(hours))
+
+    @_cached_query('metrics')
+    def _query_performance_metrics(self, hours):
+        """查詢最近hours小時的效能指標"""
+        return self._performance_metrics_cursor(hours).fetchall()
+
+    def _performance_metrics_cursor(self, hours):
+        """執行最近hours小時效能指標的查詢，回傳游標"""
+        start_time = _now_us() - int(hours * 3600e6)
+        return self._conn().execute(f'''
+            SELECT {_iso_sql('timestamp', '%Y-%m-%dT%H:%M:%S')} AS timestamp,
+                   memory_usage, network_speed, cpu_usage
+            FROM performance_metrics
+            WHERE performance_metrics.timestamp > ?
+            ORDER BY performance_metrics.timestamp ASC
+        ''', (start_time,))
 
     def add_performance_metric(self, memory_usage=None, network_speed=None,
                               cpu_usage=None, error_count=0, retry_count=0):
-        """添加效能指標"""
-        with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                timestamp = datetime.now().isoformat()
-
-                cursor.execute('''
-                    INSERT OR REPLACE INTO performance_metrics
-                    (timestamp, memory_usage, network_speed, cpu_usage, error_count, retry_count)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (timestamp, memory_usage, network_speed, cpu_usage, error_count, retry_count))
-
-                conn.commit()
-
+        """添加效能指標，先暫存在記憶體中，累積到一定數量或時間後批次寫入
+
+        不加鎖也不觸及資料庫：deque.append 為原子操作，取出和寫入都在寫入線程進行
+        """
+        self._metric_buffer.append((_now_us(), memory_usage, network_speed,
+                                    cpu_usage, error_count, retry_count))
+        if not self._metric_flush_pending.is_set() and (
+                len(self._metric_buffer) >= self.metric_flush_threshold
+                or time.monotonic() - self._last_metric_flush >= self.metric_flush_interval):
+            self.flush_metrics(wait=False)
+
+    def flush_metrics(self, wait=True):
+        """請寫入線程寫入暫存的效能指標
+
+        等待時即使暫存已空也排隊一次：寫入依序執行，返回時之前取出的指標都已提交；
+        不等待時，已有排隊中的寫入就不再重複排隊
+        """
+        self._last_metric_flush = time.monotonic()
+        if not wait:
+            with self._metric_flush_lock:
+                if self._metric_flush_pending.is_set() or not self._metric_buffer:
+                    return
+                self._metric_flush_pending.set()
+        self._submit(self._write_metrics, 'metrics', wait=wait)
+
+    def _write_metrics(self, cursor):
+        """取出暫存的效能指標，以一條executemany寫入並刪除過期的指標"""
+        # 先清除再取出：之後加入的指標會再排一次寫入
+        self._metric_flush_pending.clear()
+        rows = []
+        while self._metric_buffer:
+            rows.append(self._metric_buffer.popleft())
+        if not rows:
+            return
+
+        cursor.executemany('''
+            INSERT INTO performance_metrics
+            (timestamp, memory_usage, network_speed, cpu_usage, error_count, retry_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(timestamp) DO UPDATE SET
+                memory_usage = excluded.memory_usage,
+                network_speed = excluded.network_speed,
+                cpu_usage = excluded.cpu_usage,
+                error_count = excluded.error_count,
+                retry_count = excluded.retry_count
+        ''', rows)
+        # 時間戳即rowid，過期的指標位於B樹最左端；每次最多刪一批，表大小維持在保留期內
+        self._delete_metrics_batch(cursor, self._metric_cutoff())
+
+    def _metric_cutoff(self):
+        """效能指標保留期的起點(微秒時間戳)"""
+        return _now_us() - self.metric_retention_days * 86400 * 10**6
+
+    @_cached_query('sessions')
     def get_summary_stats(self):
         """獲取總結統計數據"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            # 總計統計
-            cursor.execute('''
-                SELECT COUNT(*), SUM(total_weibos), SUM(image_count), SUM(video_count),
-                       AVG(efficiency), COUNT(DISTINCT user_id)
-                FROM crawl_sessions
-                WHERE status='completed'
-            ''')
-
-            result = cursor.fetchone()
-            if not result:
-                return None
-
-            total_sessions, total_weibos, total_images, total_videos, avg_efficiency, unique_users = result
-
-            # 今日統計
-            today = datetime.now().date().isoformat()
-            cursor.execute('''
-                SELECT successful_sessions, total_weibos, total_images, total_videos
-                FROM daily_stats
-                WHERE date=?
-            ''', (today,))
-
-            today_stats = cursor.fetchone()
-            today_sessions, today_weibos, today_images, today_videos = today_stats or (0, 0, 0, 0)
-
-            return {
-                'total_sessions': total_sessions or 0,
-                'total_weibos': total_weibos or 0,
-                'total_images': total_images or 0,
-                'total_videos': total_videos or 0,
-                'avg_efficiency': avg_efficiency or 0,
-                'unique_users': unique_users or 0,
-                'today_sessions': today_sessions,
-                'today_weibos': today_weibos,
-                'today_images': today_images,
-                'today_videos': today_videos
-            }
+        cursor = self._conn().cursor()
+
+        # 總計統計，由累計總數直接讀取；有成功會話的用戶成功率大於0
+        cursor.execute('''
+            SELECT total_sessions, total_weibos, total_images, total_videos, sum_efficiency,
+                   (SELECT COUNT(*) FROM user_stats WHERE success_rate > 0)
+            FROM totals WHERE id = 1
+        ''')
+
+        result = cursor.fetchone()
+        if not result:
+            return None
+
+        total_sessions, total_weibos, total_images, total_videos, sum_efficiency, unique_users = result
+        avg_efficiency = sum_efficiency / total_sessions if total_sessions else 0
+
+        # 今日統計
+        today = datetime.now().date().isoformat()
+        cursor.execute('''
+            SELECT successful_sessions, total_weibos, total_images, total_videos
+            FROM daily_stats
+            WHERE date=?
+        ''', (today,))
+
+        today_stats = cursor.fetchone()
+        today_sessions, today_weibos, today_images, today_videos = today_stats or (0, 0, 0, 0)
+
+        return {
+            'total_sessions': total_sessions or 0,
+            'total_weibos': total_weibos or 0,
+            'total_images': total_images or 0,
+            'total_videos': total_videos or 0,
+            'avg_efficiency': avg_efficiency or 0,
+            'unique_users': unique_users or 0,
+            'today_sessions': today_sessions,
+            'today_weibos': today_weibos,
+            'today_images': today_images,
+            'today_videos': today_videos
+        }
 
     def cleanup_old_data(self, days=365):
         """清理舊數據（保留最近days天的數據）"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-
-        with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                # 清理舊的會話記錄
-                cursor.execute('DELETE FROM crawl_sessions WHERE start_time < ?',
-                              (cutoff_date.isoformat(),))
-
-                # 清理舊的效能指標（只保留最近7天）
-                perf_cutoff = datetime.now() - timedelta(days=7)
-                cursor.execute('DELETE FROM performance_metrics WHERE timestamp < ?',
-                              (perf_cutoff.isoformat(),))
-
-                conn.commit()
-
-                deleted_sessions = cursor.rowcount
-                cursor.execute('DELETE FROM performance_metrics WHERE timestamp < ?',
-                              (perf_cutoff.isoformat(),))
-                deleted_metrics = cursor.rowcount
-
-                self.logger.info(f"清理了 {deleted_sessions} 條舊會話記錄和 {deleted_metrics} 條效能指標記錄")
-                return deleted_sessions + deleted_metrics
+        cutoff = _now_us() - days * 86400 * 10**6
+
+        deleted_sessions = self._delete_in_batches(self._delete_sessions_batch, 'sessions', cutoff)
+        # 舊的效能指標只保留 metric_retention_days 天
+        deleted_metrics = self._delete_in_batches(self._delete_metrics_batch, 'metrics',
+                                                  self._metric_cutoff())
+
+        self.logger.info(f"清理了 {deleted_sessions} 條舊會話記錄和 {deleted_metrics} 條效能指標記錄")
+        return deleted_sessions + deleted_metrics
+
+    def _delete_in_batches(self, delete_batch, group, cutoff):
+        """分批刪除，每批是各自的寫入工作，其間可穿插其他寫入"""
+        deleted = 0
+        while True:
+            count = self._submit(delete_batch, group, args=(cutoff,))
+            deleted += count
+            if count < self.cleanup_batch_size:
+                return deleted
+
+    def _delete_sessions_batch(self, cursor, cutoff):
+        """刪除一批舊會話記錄及其配置快照，並從總計和用戶統計中扣除"""
+        # 各語句在同一交易中以相同排序選出同一批記錄
+        batch = '''
+            SELECT id FROM crawl_sessions WHERE start_time < ?
+            ORDER BY start_time, id LIMIT ?
+        '''
+        params = (cutoff, self.cleanup_batch_size)
+        cursor.execute(f'''
+            SELECT COUNT(*), TOTAL(total_weibos), TOTAL(image_count),
+                   TOTAL(video_count), TOTAL(efficiency)
+            FROM crawl_sessions WHERE id IN ({batch}) AND status='completed'
+        ''', params)
+        removed = cursor.fetchone()
+        if removed[0]:
+            self._add_totals(cursor, *(-value for value in removed))
+        cursor.execute(f'''
+            SELECT DISTINCT user_id FROM crawl_sessions
+            WHERE id IN ({batch}) AND status IN ('completed', 'failed')
+        ''', params)
+        users = cursor.fetchall()
+        cursor.execute(f'DELETE FROM crawl_session_configs WHERE id IN ({batch})', params)
+        cursor.execute(f'DELETE FROM crawl_sessions WHERE id IN ({batch})', params)
+        deleted = cursor.rowcount
+        if users:
+            self._rebuild_user_stats(cursor, users)
+        return deleted
+
+    @staticmethod
+    def _rebuild_user_stats(cursor, users):
+        """由剩餘會話重算指定用戶的統計，已沒有已結束會話的用戶直接刪除"""
+        cursor.executemany(_REBUILD_USER_STATS_SQL.format(user_filter='AND user_id = ?'), users)
+        cursor.executemany('''
+            DELETE FROM user_stats WHERE user_id = ? AND NOT EXISTS (
+                SELECT 1 FROM crawl_sessions
+                WHERE crawl_sessions.user_id = user_stats.user_id
+                  AND status IN ('completed', 'failed'))
+        ''', users)
+
+    def _delete_metrics_batch(self, cursor, cutoff):
+        """刪除一批舊效能指標"""
+        cursor.execute('''
+            DELETE FROM performance_metrics WHERE timestamp IN (
+                SELECT timestamp FROM performance_metrics WHERE timestamp < ?
+                ORDER BY timestamp LIMIT ?)
+        ''', (cutoff, self.cleanup_batch_size))
+        return cursor.rowcount
@@ -0,0 +1,9 @@
+import os
+
+
+def atomic_write_bytes(path, data):
+    """先写入临时文件再替换目标文件，避免写入中断导致文件损坏"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
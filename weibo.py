@@ -13,6 +13,7 @@ import random
 import re
 import sqlite3
 import sys
+import threading
 import warnings
 import webbrowser
 from collections import OrderedDict
@@ -81,9 +82,17 @@ logger = logging.getLogger("weibo")
 # 日期时间格式
 DTFORMAT = "%Y-%m-%dT%H:%M:%S"
 
+# 多线程爬取时保护用户配置文件的读写
+user_config_file_lock = threading.Lock()
+# 多线程爬取时同一时间只允许一个线程打开验证码页面并读取终端输入
+captcha_prompt_lock = threading.Lock()
+
 class Weibo(object):
-    def __init__(self, config):
-        """Weibo类初始化"""
+    def __init__(self, config, session=None, user_config_list=None):
+        """Weibo类初始化，session可传入共用的requests.Session以复用连接
+
+        user_config_list可传入已解析的用户配置，此时不再读取用户配置文件
+        """
         self.validate_config(config)
         self.only_crawl_original = config["only_crawl_original"]  # 取值范围为0、1,程序默认值为0,代表要爬取用户的全部微博,1代表只爬取用户的原创微博
         self.remove_html_tag = config[
@@ -103,6 +112,7 @@ class Weibo(object):
             sys.exit()
         self.since_date = since_date  # 起始时间，即爬取发布日期从该值到现在的微博，形式为yyyy-mm-ddThh:mm:ss，如：2023-08-21T09:23:03
         self.start_page = config.get("start_page", 1)  # 开始爬的页，如果中途被限制而结束可以用此定义开始页码
+        self.stop_event = config.get("_stop_event")  # 可选的threading.Event，由调用方(如GUI)设置以请求停止爬取
         self.write_mode = config[
             "write_mode"
         ]  # 结果信息保存类型，为list形式，可包含csv、mongo和mysql三种类型
@@ -134,13 +144,6 @@ class Weibo(object):
         self.user_id_as_folder_name = config.get(
             "user_id_as_folder_name", 0
         )  # 结果目录名，取值为0或1，决定结果文件存储在用户昵称文件夹里还是用户id文件夹里
-        cookie_string = config.get("cookie", "")  # 微博cookie，可填可不填
-        cookies = {}
-        if isinstance(cookie_string, str) and cookie_string.strip():
-            for pair in cookie_string.split(';'):
-                if '=' in pair.strip():
-                    key, value = pair.split('=', 1)
-                    cookies[key.strip()] = value.strip()
         self.headers = {
             'Referer': 'https://weibo.com/',
             'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -165,15 +168,12 @@ class Weibo(object):
         self.llm_analyzer = LLMAnalyzer(config) if config.get("llm_config") else None
         
         user_id_list = config["user_id_list"]
-        requests_session = requests.Session()
-        requests_session.cookies.update(cookies)
-
-        self.session = requests_session
-        adapter = HTTPAdapter(max_retries=5)
-        self.session.mount('http://', adapter)
-        self.session.mount('https://', adapter)
-        # 避免卡住
-        if isinstance(user_id_list, list):
+        if session is None:
+            # 传入的共享session由调用方负责配置cookie与重试
+            session = self.create_session(config.get("cookie", ""))
+        self.session = session
+        # 避免卡住；传入已解析的用户配置时不再打乱调用方共用的列表
+        if user_config_list is None and isinstance(user_id_list, list):
             random.shuffle(user_id_list)
 
         query_list = config.get("query_list") or []
@@ -186,9 +186,11 @@ class Weibo(object):
                     os.path.split(os.path.realpath(__file__))[0] + os.sep + user_id_list
                 )
             self.user_config_file_path = user_id_list  # 用户配置文件路径
-            user_config_list = self.get_user_config_list(user_id_list)
+            if user_config_list is None:
+                user_config_list = self.get_user_config_list(user_id_list)
         else:
             self.user_config_file_path = ""
+        if user_config_list is None:
             user_config_list = [
                 {
                     "user_id": user_id,
@@ -208,8 +210,41 @@ class Weibo(object):
         self.weibo_id_list = []  # 存储爬取到的所有微博id
         self.long_sleep_count_before_each_user = 0 #每个用户前的长时间sleep避免被ban
         self.store_binary_in_sqlite = config.get("store_binary_in_sqlite", 0)
-    def validate_config(self, config):
-        """验证配置是否正确"""
+    def is_stopped(self):
+        """判断调用方是否已请求停止爬取"""
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def wait(self, seconds):
+        """等待指定秒数，收到停止信号时提前返回"""
+        if self.stop_event is None:
+            sleep(seconds)
+        else:
+            self.stop_event.wait(seconds)
+
+    @staticmethod
+    def parse_cookie(cookie_string):
+        """将"k1=v1; k2=v2"形式的cookie字符串解析为字典"""
+        cookies = {}
+        if isinstance(cookie_string, str) and cookie_string.strip():
+            for pair in cookie_string.split(';'):
+                if '=' in pair.strip():
+                    key, value = pair.split('=', 1)
+                    cookies[key.strip()] = value.strip()
+        return cookies
+
+    @classmethod
+    def create_session(cls, cookie_string=""):
+        """创建带重试与cookie的requests会话"""
+        session = requests.Session()
+        session.cookies.update(cls.parse_cookie(cookie_string))
+        adapter = HTTPAdapter(max_retries=5)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @classmethod
+    def validate_config(cls, config):
+        """验证配置是否正确，无需创建Weibo实例即可调用"""
 
         # 验证如下1/0相关值
         argument_list = [
@@ -265,7 +300,7 @@ class Weibo(object):
 
         # 验证since_date
         since_date = config["since_date"]
-        if (not isinstance(since_date, int)) and (not self.is_datetime(since_date)) and (not self.is_date(since_date)):
+        if (not isinstance(since_date, int)) and (not cls.is_datetime(since_date)) and (not cls.is_date(since_date)):
             logger.warning("since_date值应为yyyy-mm-dd形式、yyyy-mm-ddTHH:MM:SS形式或整数，请重新输入")
             sys.exit()
 
@@ -285,7 +320,8 @@ class Weibo(object):
             logger.warning("最大下载转发数 (repost_max_download_count) 应该为正整数")
             sys.exit()
 
-    def is_datetime(self, since_date):
+    @staticmethod
+    def is_datetime(since_date):
         """判断日期格式是否为 %Y-%m-%dT%H:%M:%S"""
         try:
             datetime.strptime(since_date, DTFORMAT)
@@ -293,7 +329,8 @@ class Weibo(object):
         except ValueError:
             return False
     
-    def is_date(self, since_date):
+    @staticmethod
+    def is_date(since_date):
         """判断日期格式是否为 %Y-%m-%d"""
         try:
             datetime.strptime(since_date, "%Y-%m-%d")
@@ -328,13 +365,18 @@ class Weibo(object):
         logger.debug(f"收到的 JSON 数据：{js}")
         
         captcha_url = js.get("url")
-        if captcha_url:
-            logger.warning("检测到验证码挑战。正在打开验证码页面以供手动验证。")
-            webbrowser.open(captcha_url)
-        else:
+        if not captcha_url:
             logger.warning("检测到可能的验证码挑战，但未提供验证码 URL。请手动检查浏览器并完成验证码验证。")
             return False
-        
+        with captcha_prompt_lock:
+            if self.is_stopped():
+                return False
+            return self._prompt_captcha(captcha_url)
+
+    def _prompt_captcha(self, captcha_url):
+        """打开验证码页面并等待用户在终端确认，调用方需持有captcha_prompt_lock"""
+        logger.warning("检测到验证码挑战。正在打开验证码页面以供手动验证。")
+        webbrowser.open(captcha_url)
         logger.info("请在打开的浏览器窗口中完成验证码验证。")
         while True:
             try:
@@ -668,9 +710,7 @@ class Weibo(object):
             if not need_download:
                 return 
 
-            s = requests.Session()
-            s.mount('http://', HTTPAdapter(max_retries=5))
-            s.mount('https://', HTTPAdapter(max_retries=5))
+            s = self.session
             try_count = 0
             success = False
             MAX_TRY_COUNT = 3
@@ -2184,6 +2224,10 @@ class Weibo(object):
 
     def update_user_config_file(self, user_config_file_path):
         """更新用户配置文件"""
+        with user_config_file_lock:
+            self._update_user_config_file(user_config_file_path)
+
+    def _update_user_config_file(self, user_config_file_path):
         with open(user_config_file_path, "rb") as f:
             try:
                 lines = f.read().splitlines()
@@ -2260,6 +2304,9 @@ class Weibo(object):
                 self.start_date = datetime.now().strftime(DTFORMAT)
                 pages = range(self.start_page, page_count + 1)
                 for page in tqdm(pages, desc="Progress"):
+                    if self.is_stopped():
+                        logger.info("收到停止信号，停止爬取 %s 的微博", self.user["screen_name"])
+                        break
                     is_end = self.get_one_page(page)
                     if is_end:
                         break
@@ -2272,7 +2319,7 @@ class Weibo(object):
                     # 制会自动解除)，加入随机等待模拟人的操作，可降低被系统限制的风险。默
                     # 认是每爬取1到5页随机等待6到10秒，如果仍然被限，可适当增加sleep时间
                     if (page - page1) % random_pages == 0 and page < page_count:
-                        sleep(random.randint(6, 10))
+                        self.wait(random.randint(6, 10))
                         page1 = page
                         random_pages = random.randint(1, 5)
 
@@ -2283,7 +2330,8 @@ class Weibo(object):
 
     def get_user_config_list(self, file_path):
         """获取文件中的微博id信息"""
-        with open(file_path, "rb") as f:
+        # 与update_user_config_file使用同一把锁，避免读到其他线程写了一半的文件
+        with user_config_file_lock, open(file_path, "rb") as f:
             try:
                 lines = f.read().splitlines() 
                 lines = [line.decode("utf-8-sig") for line in lines]
@@ -2328,22 +2376,30 @@ class Weibo(object):
         self.got_count = 0
         self.weibo_id_list = []
 
+    def crawl_user(self, user_config):
+        """爬取单个用户的微博"""
+        if len(user_config["query_list"]):
+            for query in user_config["query_list"]:
+                if self.is_stopped():
+                    break
+                self.query = query
+                self.initialize_info(user_config)
+                self.get_pages()
+        else:
+            self.initialize_info(user_config)
+            self.get_pages()
+        logger.info("信息抓取完毕")
+        logger.info("*" * 100)
+        if self.user_config_file_path and self.user:
+            self.update_user_config_file(self.user_config_file_path)
+
     def start(self):
         """运行爬虫"""
         try:
             for user_config in self.user_config_list:
-                if len(user_config["query_list"]):
-                    for query in user_config["query_list"]:
-                        self.query = query
-                        self.initialize_info(user_config)
-                        self.get_pages()
-                else:
-                    self.initialize_info(user_config)
-                    self.get_pages()
-                logger.info("信息抓取完毕")
-                logger.info("*" * 100)
-                if self.user_config_file_path and self.user:
-                    self.update_user_config_file(self.user_config_file_path)
+                if self.is_stopped():
+                    break
+                self.crawl_user(user_config)
         except Exception as e:
             logger.exception(e)
 